@@ -0,0 +1,160 @@
+"""
+Sentence boundaries from BeFree's sentence-relative offset files.
+
+BeFree lists every entity mention with its PMID, the number of the
+sentence it is in (NUM_SENT, where sentence 0 is the title) and the
+text of that sentence, e.g.
+BC5_track3/PubMed_query_set1/chemicals_entities_tmChem_sent_relative_offtets.txt.
+Only sentences with a mention are listed, and the v2 files leave the
+section label ("RESULTS: ") out of the sentence text.
+
+The listed sentences are matched against the abstract in order, and
+a single unlisted sentence between two listed ones is the text in
+between. Only the remaining stretches of the abstract (several
+unlisted sentences in a row, or the sentences after the last listed
+one) and the abstracts which the files do not cover at all are sent
+to LingPipe. Whenever the listed sentences do not match the abstract
+text, the whole abstract is split by LingPipe instead.
+"""
+from collections import defaultdict
+from collections import namedtuple
+import os
+
+from .lingpipe.file_util import read_file
+from .lingpipe.split_sentences import split_abstracts
+
+SECTION_NAMES_LOC = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    "..", "data", "all_uniq_section_names.txt")
+
+# a stretch of the abstract which still needs to be split
+Unsplit = namedtuple("Unsplit", ["text"])
+
+_section_labels = None
+
+def section_labels():
+    """Known section labels ("RESULTS: "), longest first."""
+    global _section_labels
+    if _section_labels is None:
+        loc, fname = os.path.split(SECTION_NAMES_LOC)
+        _section_labels = sorted(("{}: ".format(name) for name in read_file(fname, loc)
+            if name), key = len, reverse = True)
+
+    return _section_labels
+
+def read_sentence_files(paths):
+    """Read one or more BeFree sentence-relative offset files.
+
+    Returns a dict of PMID to a dict of NUM_SENT to sentence text. Sentences
+    listed by several files (e.g. chemical and disease mentions) are merged.
+    """
+    res = defaultdict(dict)
+    for path in paths:
+        loc, fname = os.path.split(path)
+        for i, line in enumerate(read_file(fname, loc)):
+            if i == 0 or not line:
+                continue # header
+
+            vals = line.split("\t", 7)
+            assert len(vals) == 8, "Bad format for line {} of {}".format(i+1, fname)
+
+            res[int(vals[0])][int(vals[1])] = vals[7]
+
+    return dict(res)
+
+def split_label(gap):
+    """Split a known section label off the end of the text before a listed
+    sentence. Returns (text before the label, label).
+    """
+    for label in section_labels():
+        if gap.endswith(label) and (len(gap) == len(label) or gap[-len(label) - 1] == " "):
+            return (gap[ : -len(label)], label)
+
+    return (gap, "")
+
+def match_sentences(title, abstract, known):
+    """Lay the listed sentences of one paper over its abstract.
+
+    Returns a list with a string for every sentence which is now known, and
+    an Unsplit for each stretch which still needs to be split, in order.
+    Returns None if the listed sentences do not match the text.
+    """
+    if known.get(0, title) != title:
+        return None
+
+    res = []
+    cursor = 0 # start of the next sentence in the abstract
+    prev = 0 # NUM_SENT of the last placed sentence
+    for num in sorted(known):
+        if num == 0:
+            continue
+
+        text = known[num]
+        pos = abstract.find(text, cursor)
+        if not text or pos == -1:
+            return None
+
+        between, label = split_label(abstract[cursor : pos])
+
+        missing = num - prev - 1
+        if missing == 0:
+            if between:
+                return None
+        else:
+            # between is the missing sentences and the space after them
+            if len(between) < 2 or between[-1] != " " or between[-2] == " ":
+                return None
+
+            between = between[ : -1]
+            res.append(between if missing == 1 else Unsplit(between))
+
+        res.append(label + text)
+
+        cursor = pos + len(text)
+        if cursor < len(abstract):
+            if abstract[cursor] != " ":
+                return None
+
+            cursor += 1
+
+        prev = num
+
+    if cursor < len(abstract):
+        res.append(Unsplit(abstract[cursor : ]))
+
+    return res
+
+def split_records(records, known_sentences):
+    """Sentence split the abstracts of parsed PubTator records, using the
+    sentences listed in BeFree files where possible.
+
+    known_sentences is the output of read_sentence_files. Returns the list of
+    abstract sentences of each record, like split_abstracts.
+    """
+    records = list(records)
+
+    pieces = []
+    for pmid, title, abstract, annotations, relations in records:
+        matched = None
+        if pmid in known_sentences:
+            matched = match_sentences(title, abstract, known_sentences[pmid])
+
+        pieces.append(matched if matched is not None else [Unsplit(abstract)])
+
+    # everything left over is split by LingPipe in one round
+    unsplit = [piece.text for matched in pieces for piece in matched
+        if isinstance(piece, Unsplit)]
+
+    split = iter(split_abstracts(unsplit) if unsplit else [])
+
+    res = []
+    for matched in pieces:
+        sentences = []
+        for piece in matched:
+            if isinstance(piece, Unsplit):
+                sentences.extend(next(split))
+            else:
+                sentences.append(piece)
+
+        res.append(sentences)
+
+    return res
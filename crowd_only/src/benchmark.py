@@ -0,0 +1,270 @@
+"""
+Benchmarks for the corpus parsing pipeline.
+
+Run from the crowd_only directory, e.g.:
+
+    python -m src.benchmark splitting
+"""
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .cooccurrence import build_corpus_arrays
+from .cooccurrence import classify_corpus
+from .cooccurrence import paper_documents
+from .cooccurrence import to_poss_relations
+from .corpus_tables import load_corpus_tables
+from .corpus_tables import relation_array
+from .corpus_tables import save_corpus_tables
+from .data_model import Annotation
+from .data_model import VALIDATION_LEVELS
+from .data_model import is_MeSH_id
+from .data_model import make_paper
+from .data_model import parse_input
+from .data_model import read_pubtator
+from .lingpipe.file_util import read_file
+from .lingpipe.split_sentences import SentenceSplitter
+from .lingpipe.split_sentences import split_abstracts
+from .triggers import get_rules
+
+GOLD_LOC = os.path.join(os.path.dirname(__file__), "..", "data", "gold_standard")
+
+def read_abstracts(fname, loc = GOLD_LOC):
+    """Grab just the abstract text of every paper in a PubTator file."""
+    for line in read_file(fname, os.path.abspath(loc)):
+        vals = line.split("|", 2)
+        if len(vals) == 3 and vals[1] == "a":
+            yield vals[2]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    res = func(*args)
+    return (time.perf_counter() - start, res)
+
+def traced(func, *args):
+    """Bytes allocated by func that are still alive once it returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    res = func(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before, res)
+
+#-------------------------------------------------------------------------------
+# Reference versions of what the benchmarks replaced, so that each benchmark
+# measures the old and the new way side by side.
+
+class DictOntologyID:
+    """OntologyID before __slots__ and interning: every annotation makes its
+    own identifier objects, each with a __dict__.
+    """
+    def __init__(self, text):
+        if ":" in text:
+            self.uid_type, self.uid = text.split(":")
+        else:
+            self.uid = text
+            self.uid_type = "MESH" if is_MeSH_id(self.uid) else "unknown"
+
+        self.flat_repr = "{}:{}".format(self.uid_type, self.uid)
+
+    def __eq__(self, other):
+        return self.__dict__ == other.__dict__
+
+    def __hash__(self):
+        return hash(self.flat_repr)
+
+class DictMultiID:
+    def __init__(self, text):
+        self.uid = frozenset(DictOntologyID(v) for v in text.split("|"))
+        self.flat_repr = "|".join(sorted(v.flat_repr for v in self.uid))
+
+class DictAnnotation:
+    """Annotation before __slots__, which also kept its own text."""
+    def __init__(self, uid, stype, text, start, stop):
+        self.uid = DictMultiID(uid)
+        self.text = text
+        self.start = int(start)
+        self.stop = int(stop)
+        self.stype = stype.lower()
+
+def own_text(papers):
+    """Give every Annotation and Sentence its own copy of its text, the way
+    Positions were stored before they were sliced out of the Paper's text.
+    """
+    for paper in papers:
+        for pos in paper.annotations + paper.sentences:
+            pos.doc = pos.text
+            pos.offset = pos.start
+
+    return papers
+
+#-------------------------------------------------------------------------------
+
+def bench_splitting(fname = "CDR_TrainingSet.txt"):
+    """Compare per-abstract and batched sentence splitting.
+
+    A fresh Java process is used for each method so that both times include
+    one JVM startup.
+    """
+    abstracts = list(read_abstracts(fname))
+
+    with SentenceSplitter() as splitter:
+        single_time, single = timed(
+            lambda: [splitter.split(abstract) for abstract in abstracts])
+
+    with SentenceSplitter() as splitter:
+        batch_time, batch = timed(splitter.split_many, abstracts)
+
+    assert single == batch, "Batched splitting gave different sentences!"
+
+    print("{} abstracts from {}".format(len(abstracts), fname))
+    print("Per-abstract: {:.2f} s".format(single_time))
+    print("Batched: {:.2f} s".format(batch_time))
+    print("Speedup: {:.1f}x".format(single_time / batch_time))
+
+def bench_memory(fname = "CDR_TestSet.txt"):
+    """Measure the memory used per Annotation and per Paper, with and without
+    __slots__ and a shared document string.
+
+    The raw text fields are read first so that only the memory of the
+    Annotation objects themselves (and the identifiers they own) is counted.
+    """
+    fields = []
+    for line in read_file(fname, os.path.abspath(GOLD_LOC)):
+        vals = line.split("\t")
+        if len(vals) >= 5 and vals[1] != "CID":
+            uid = vals[5] if len(vals) > 5 else "-1"
+            fields.append((uid, vals[4], vals[3], vals[1], vals[2]))
+
+    print("{} annotations from {}".format(len(fields), fname))
+    for label, cls in [("__dict__", DictAnnotation), ("__slots__", Annotation)]:
+        size, annotations = traced(lambda: [cls(*vals) for vals in fields])
+        print("Bytes per annotation ({}): {:.0f}".format(label, size / len(annotations)))
+
+    del annotations
+
+    # whole Papers, counting everything they keep alive once the parsed
+    # records and split sentences are gone
+    path = os.path.join(os.path.abspath(GOLD_LOC), fname)
+    split_abstracts(read_abstracts(fname)) # fill the split cache
+
+    def build_papers():
+        all_sentences = split_abstracts(read_abstracts(fname))
+        return [make_paper((record, sentences, True, "strict", None))
+            for record, sentences in zip(read_pubtator(path), all_sentences)]
+
+    for label, build in [("own text", lambda: own_text(build_papers())),
+        ("shared text", build_papers)]:
+
+        size, papers = traced(build)
+        print("Bytes per paper ({}): {:.0f}".format(label, size / len(papers)))
+        del papers
+
+def bench_cooccurrence(fname = "CDR_TestSet.txt", copies = 20):
+    """Compare per-sentence relation classification with the corpus-wide
+    vectorized engine, on several copies of a corpus.
+    """
+    papers = list(parse_input(os.path.abspath(GOLD_LOC), fname).values()) * copies
+
+    def per_sentence():
+        for paper in papers:
+            triggers = get_rules().index(paper.text)
+            for sentence in paper.sentences:
+                sentence.classify_relations("strict", triggers)
+
+            paper.classify_relations()
+
+    loop_time, res = timed(per_sentence)
+    build_time, arrays = timed(build_corpus_arrays, paper_documents(papers))
+    engine_time, tables = timed(classify_corpus, arrays)
+    convert_time, res = timed(to_poss_relations, arrays, tables)
+
+    assert all(res[paper.pmid] == paper.poss_relations for paper in papers)
+
+    print("{} papers ({} copies of {})".format(len(papers), copies, fname))
+    print("Per-sentence classification: {:.2f} s".format(loop_time))
+    print("Building corpus arrays: {:.2f} s".format(build_time))
+    print("Vectorized classification: {:.2f} s".format(engine_time))
+    print("Converting back to poss_relations: {:.2f} s".format(convert_time))
+
+def bench_validation(fname = "CDR_TrainingSet.txt", repeat = 5):
+    """Time reading and building every Paper of a corpus at each validation
+    level.
+
+    The abstracts are sentence split beforehand, so only the parsing and
+    the checks themselves are timed.
+    """
+    path = os.path.join(os.path.abspath(GOLD_LOC), fname)
+    all_sentences = split_abstracts(record[2] for record in read_pubtator(path))
+
+    def build(validation):
+        return [make_paper((record, sentences, True, validation, None))
+            for record, sentences in zip(read_pubtator(path, validation = validation),
+                all_sentences)]
+
+    print("{} papers from {}".format(len(all_sentences), fname))
+
+    def summary(papers):
+        return [(paper.annotations, paper.sentences, paper.poss_relations)
+            for paper in papers]
+
+    res = dict()
+    times = dict()
+    for validation in VALIDATION_LEVELS:
+        # best of several runs, since a single corpus only takes a moment
+        elapsed, papers = min((timed(build, validation) for i in range(repeat)),
+            key = lambda run: run[0])
+
+        res[validation] = summary(papers)
+        times[validation] = elapsed
+        print("{}: {:.3f} s".format(validation, elapsed))
+
+    # "strict" runs every check, as Papers always did before validation levels
+    print("Speedup of off over strict: {:.2f}x".format(times["strict"] / times["off"]))
+
+    assert all(res[validation] == res["strict"] for validation in VALIDATION_LEVELS), (
+        "Validation level changed the parsed corpus!")
+
+def bench_tables(fname = "CDR_TrainingSet.txt"):
+    """Compare unpickling a parsed corpus with loading its exported tables,
+    up to having the gold relation array in hand.
+    """
+    papers = parse_input(os.path.abspath(GOLD_LOC), fname)
+    data = pickle.dumps(papers)
+
+    location = tempfile.mkdtemp()
+    try:
+        save_corpus_tables(papers, location)
+
+        pickle_time, res = timed(pickle.loads, data)
+        table_time, gold = timed(
+            lambda: relation_array(load_corpus_tables(location)["gold_relations"]))
+    finally:
+        shutil.rmtree(location)
+
+    assert len(gold) == sum(len(paper.gold_relations) for paper in res.values())
+
+    print("{} papers from {}".format(len(papers), fname))
+    print("Unpickling Papers: {:.3f} s".format(pickle_time))
+    print("Memory-mapped tables: {:.3f} s".format(table_time))
+
+BENCHMARKS = {
+    "cooccurrence": bench_cooccurrence,
+    "memory": bench_memory,
+    "splitting": bench_splitting,
+    "tables": bench_tables,
+    "validation": bench_validation,
+}
+
+def main():
+    names = sys.argv[1:] or sorted(BENCHMARKS)
+    for name in names:
+        print("--- {} ---".format(name))
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
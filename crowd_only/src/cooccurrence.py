@@ -0,0 +1,304 @@
+"""
+Corpus-wide, vectorized chemical-disease co-occurrence detection.
+
+Paper.classify_relations works one sentence at a time, looping over
+every concept and annotation. This module does the same
+classification for a whole corpus at once:
+
+1. Every annotation's MeSH ids and every sentence boundary are laid
+    out in flat arrays, with each document shifted to its own range of
+    global character offsets.
+2. Annotations are assigned to sentences with one searchsorted call.
+3. All chemical-disease pairs inside each sentence are generated in
+    bulk and checked against the CID pattern.
+4. The CID, sentence-bound and abstract-level relation tables are
+    produced with NumPy set operations. Inside the engine a relation
+    is packed into one int64 (document index, chemical code, disease
+    code), and only the final tables are relation arrays (see
+    mesh_ids).
+
+The results are identical to the poss_relations of each Paper.
+
+This is a standalone API for classifying whole corpora (e.g. to compare
+trigger rules, or to get relation tables without building Papers), and
+parse_input does not use it: Papers also keep the relations of each
+Sentence, which are still classified one sentence at a time. Only
+classify_corpus itself is vectorized. build_corpus_arrays still visits
+every annotation in Python, and to_poss_relations builds the same sets
+of OntologyID pairs as a Paper, so going from Papers to poss_relations
+and back is no faster than the per-sentence classification (see
+`python -m src.benchmark cooccurrence`).
+"""
+from collections import defaultdict
+from collections import namedtuple
+import numpy as np
+
+from .data_model import AbstractRelations
+from .data_model import OntologyID
+from .mesh_ids import decode_mesh_ids
+from .mesh_ids import make_relations
+from .triggers import find_spans
+from .triggers import get_rules
+
+CODE_BITS = 22 # encoded MeSH ids are all less than 2 ** 22 (see mesh_ids)
+CODE_MASK = (1 << CODE_BITS) - 1
+MAX_DOCS = 1 << (63 - 2 * CODE_BITS)
+
+ORIGINS = ("CID", "sent", "abs")
+
+Span = namedtuple("Span", ["start", "stop"])
+
+def paper_documents(papers):
+    """The (pmid, text, sentence offsets, annotations) of each Paper."""
+    for paper in papers:
+        yield (paper.pmid, paper.text,
+            [(sentence.start, sentence.stop) for sentence in paper.sentences],
+            paper.annotations)
+
+def build_corpus_arrays(documents, rules = None):
+    """Flatten the sentences and annotations of a corpus into arrays.
+
+    Each document is a tuple of (pmid, text, sentence offsets, annotations),
+    where the annotations are sorted by position as in a Paper. There is one
+    "mention" row for each MeSH id of each annotation. The forward and
+    reverse trigger spans of the TriggerRules (by default the shared ones,
+    see triggers) are found with one scan of each document.
+    """
+    if rules is None:
+        rules = get_rules()
+
+    pmids = []
+    texts = []
+    doc_offset = []
+    sentences = []
+    mentions = []
+    triggers = {False: [], True: []}
+    slow_docs = []
+
+    add_mention = mentions.append
+
+    offset = 0
+    for doc, (pmid, text, spans, annotations) in enumerate(documents):
+        pmids.append(pmid)
+        texts.append(text)
+        doc_offset.append(offset)
+
+        sentences.extend((doc, stop + offset) for start, stop in spans)
+
+        # Paper.split_sentences only moves on to the next annotation once the
+        # current one fits in a sentence, so an annotation can't be placed in a
+        # sentence before the end of any earlier annotation
+        reach = offset
+        for annot in annotations:
+            start = annot.start + offset
+            stop = annot.stop + offset
+            if stop > reach:
+                reach = stop
+
+            is_chem = annot.stype == "chemical"
+            for uid in annot.uid.uid:
+                if uid.code is not None:
+                    add_mention((doc, start, stop, reach, is_chem, uid.code))
+
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            for reverse, patterns in [(False, rules.forward), (True, rules.reverse)]:
+                triggers[reverse].extend((start + offset, stop + offset)
+                    for start, stop in find_spans(lowered, patterns))
+        else:
+            # lowercasing changed the offsets, so check this text by hand
+            slow_docs.append(doc)
+
+        offset += len(text) + 1
+
+    assert len(pmids) < MAX_DOCS, "Too many documents for one corpus!"
+
+    sentences = np.array(sentences, dtype = np.int64).reshape(-1, 2)
+    mentions = np.array(mentions, dtype = np.int64).reshape(-1, 6)
+
+    return {
+        "pmid": np.array(pmids, dtype = np.int64),
+        "text": texts,
+        "doc_offset": np.array(doc_offset, dtype = np.int64),
+        "sent_doc": sentences[:, 0],
+        "sent_stop": sentences[:, 1],
+        "mention_doc": mentions[:, 0],
+        "mention_start": mentions[:, 1],
+        "mention_stop": mentions[:, 2],
+        "mention_reach": mentions[:, 3],
+        "mention_chem": mentions[:, 4].astype(bool),
+        "mention_code": mentions[:, 5],
+        "rules": rules,
+        "triggers": {reverse: trigger_arrays(spans) for reverse, spans in triggers.items()},
+        "slow_docs": np.array(slow_docs, dtype = np.int64),
+    }
+
+def trigger_arrays(spans):
+    """The starts of the sorted trigger spans, and the earliest end of any
+    span from each one on (see triggers.TriggerIndex).
+    """
+    spans = np.array(spans, dtype = np.int64).reshape(-1, 2)
+    return (spans[:, 0], np.minimum.accumulate(spans[::-1, 1])[::-1])
+
+def group_product(left, right):
+    """Pair up every row of left with every row of right in the same group.
+
+    Given an array of group ids for each side (right must be sorted), returns
+    the index arrays (i, j) of all pairs with left[i] == right[j].
+    """
+    lo = np.searchsorted(right, left, "left")
+    counts = np.searchsorted(right, left, "right") - lo
+
+    i = np.repeat(np.arange(len(left)), counts)
+    j = np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+    return (i, j)
+
+def has_trigger(arrays, reverse, left_stop, right_start):
+    """Is there a trigger span inside each [left_stop, right_start)?"""
+    starts, min_stops = arrays["triggers"][reverse]
+
+    idx = np.searchsorted(starts, left_stop, "left")
+    found = idx < len(starts)
+    found[found] = min_stops[idx[found]] <= right_start[found]
+    return found
+
+def find_cid_pairs(arrays, chem, dise):
+    """Determine which chemical-disease mention pairs follow the CID structure.
+
+    Same test as Sentence.is_CID_relation: the two are at most max_gap
+    characters apart, and the text in between contains a forward trigger
+    (chemical first) or a reverse trigger (disease first).
+    """
+    rules = arrays["rules"]
+
+    chem_start = arrays["mention_start"][chem]
+    chem_stop = arrays["mention_stop"][chem]
+    dise_start = arrays["mention_start"][dise]
+    dise_stop = arrays["mention_stop"][dise]
+
+    res = ((chem_stop < dise_start) & (dise_start - chem_stop <= rules.max_gap)
+        & has_trigger(arrays, False, chem_stop, dise_start))
+
+    if rules.reverse:
+        res |= ((dise_stop < chem_start) & (chem_start - dise_stop <= rules.max_gap)
+            & has_trigger(arrays, True, dise_stop, chem_start))
+
+    if not len(arrays["slow_docs"]):
+        return res
+
+    indexes = dict()
+    slow = np.isin(arrays["mention_doc"][chem], arrays["slow_docs"])
+    for k in np.flatnonzero(slow):
+        doc = arrays["mention_doc"][chem[k]]
+        if doc not in indexes:
+            indexes[doc] = rules.index(arrays["text"][doc])
+
+        res[k] = rules.is_cid(indexes[doc], Span(chem_start[k], chem_stop[k]),
+            Span(dise_start[k], dise_stop[k]), arrays["doc_offset"][doc])
+
+    return res
+
+def pack(doc, chem, dise):
+    return (doc << (2 * CODE_BITS)) | (chem << CODE_BITS) | dise
+
+def unpack(keys, pmids):
+    """Turn packed relation keys into a relation array with real PMIDs."""
+    return make_relations(pmids[keys >> (2 * CODE_BITS)],
+        (keys >> CODE_BITS) & CODE_MASK, keys & CODE_MASK)
+
+def unique_concepts(arrays, is_chem):
+    """Sorted, unique (document, code) pairs for one semantic type."""
+    rows = arrays["mention_chem"] == is_chem
+    keys = np.unique((arrays["mention_doc"][rows] << CODE_BITS) | arrays["mention_code"][rows])
+    return (keys >> CODE_BITS, keys & CODE_MASK)
+
+def classify_corpus(arrays):
+    """Classify all chemical-disease relations of a corpus.
+
+    Returns a dict of relation arrays with the same three mutually exclusive
+    groups as Paper.classify_relations ("CID", "sent", and "abs").
+    """
+    doc = arrays["mention_doc"]
+    code = arrays["mention_code"]
+
+    # the sentence of each mention is the first one ending at or after it
+    sent_stop = arrays["sent_stop"]
+    sent = np.searchsorted(sent_stop, arrays["mention_reach"], "left")
+    placed = sent < len(sent_stop)
+    placed[placed] = arrays["sent_doc"][sent[placed]] == doc[placed]
+
+    chem = np.flatnonzero(placed & arrays["mention_chem"])
+    dise = np.flatnonzero(placed & ~arrays["mention_chem"])
+    dise = dise[np.argsort(sent[dise], kind = "stable")]
+
+    i, j = group_product(sent[chem], sent[dise])
+    chem, dise = chem[i], dise[j]
+
+    pairs = pack(doc[chem], code[chem], code[dise])
+    is_cid = find_cid_pairs(arrays, chem, dise)
+
+    cid_rels = np.unique(pairs[is_cid])
+    sentence_rels = np.setdiff1d(np.unique(pairs), cid_rels, assume_unique = True)
+
+    # every chemical concept with every disease concept of the same document
+    chem_doc, chem_code = unique_concepts(arrays, True)
+    dise_doc, dise_code = unique_concepts(arrays, False)
+    i, j = group_product(chem_doc, dise_doc)
+    all_rels = pack(chem_doc[i], chem_code[i], dise_code[j])
+
+    abs_rels = np.setdiff1d(all_rels, np.union1d(cid_rels, sentence_rels),
+        assume_unique = True)
+
+    pmids = arrays["pmid"]
+    return {
+        "CID": unpack(cid_rels, pmids),
+        "sent": unpack(sentence_rels, pmids),
+        "abs": unpack(abs_rels, pmids)
+    }
+
+def to_ontology_ids(codes):
+    """The OntologyID of each code, looking up each distinct code once."""
+    unique, inverse = np.unique(codes, return_inverse = True)
+    uids = [OntologyID(uid) for uid in decode_mesh_ids(unique)]
+    return [uids[i] for i in inverse.tolist()]
+
+def to_poss_relations(arrays, tables):
+    """Convert relation tables into one poss_relations dict per PMID, with the
+    same sets of OntologyID pairs that Paper.classify_relations makes.
+
+    As in a Paper, the abstract-level relations are left implicit and rebuilt
+    from each document's concepts instead of from tables["abs"].
+    """
+    pmids = arrays["pmid"].tolist()
+
+    res = {pmid: {"CID": set(), "sent": set()} for pmid in pmids}
+    for origin in ["CID", "sent"]:
+        rels = tables[origin]
+        chems = to_ontology_ids(rels["chem"])
+        dises = to_ontology_ids(rels["dise"])
+
+        for pmid, chem, dise in zip(rels["pmid"].tolist(), chems, dises):
+            res[pmid][origin].add((chem, dise))
+
+    concepts = defaultdict(lambda: {True: [], False: []})
+    for is_chem in [True, False]:
+        docs, codes = unique_concepts(arrays, is_chem)
+        for doc, uid in zip(docs.tolist(), to_ontology_ids(codes)):
+            concepts[doc][is_chem].append(uid)
+
+    for doc, pmid in enumerate(pmids):
+        rels = res[pmid]
+        rels["abs"] = AbstractRelations(concepts[doc][True], concepts[doc][False],
+            rels["CID"] | rels["sent"])
+
+    return res
+
+def classify_papers(papers, rules = None):
+    """Classify the relations of many Papers at once.
+
+    Returns a dict of PMID to poss_relations, equal to each Paper's own when
+    the Papers were made with the same TriggerRules (by default the shared
+    ones).
+    """
+    arrays = build_corpus_arrays(paper_documents(papers), rules)
+    return to_poss_relations(arrays, classify_corpus(arrays))
@@ -0,0 +1,187 @@
+"""
+Columnar export of parsed corpora.
+
+A dict of Papers is written out as five normalized tables:
+
+    papers: pmid, title, abstract
+    sentences: pmid, sentence, start, stop, text
+    annotations: pmid, annotation, sentence, start, stop, stype, text, uid
+    relations: pmid, chem, dise, chemical_id, disease_id, origin
+    gold_relations: pmid, chem, dise, chemical_id, disease_id, origin
+
+chem and dise are integer encoded MeSH ids (see mesh_ids), and
+chemical_id and disease_id the matching "MESH:D003693" strings.
+The relations table lists every candidate relation with its origin
+("CID", "sent" or "abs").
+
+Tables are saved either as uncompressed Arrow IPC files, which are
+memory-mapped on load so that opening them costs almost nothing, or
+as Parquet files for use outside of Python. Neither needs the Paper
+object graph to be rebuilt.
+"""
+from collections import defaultdict
+import os
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from .data_model import each_paper
+from .lingpipe.file_util import atomic_path
+from .mesh_ids import make_relations
+
+# bump whenever the layout of the tables changes
+TABLES_VERSION = 1
+
+TABLE_NAMES = ("papers", "sentences", "annotations", "relations", "gold_relations")
+
+FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+
+def category(values):
+    """A dictionary encoded string column."""
+    return pa.array(values, type = pa.string()).dictionary_encode()
+
+def relation_table(rows):
+    """Build a relation table from (pmid, chem, dise, origin) rows, where chem
+    and dise are OntologyIDs.
+    """
+    pmids, chems, dises, origins = zip(*rows) if rows else ([], [], [], [])
+    return pa.table({
+        "pmid": pa.array(pmids, type = pa.int64()),
+        "chem": pa.array([uid.code for uid in chems], type = pa.int32()),
+        "dise": pa.array([uid.code for uid in dises], type = pa.int32()),
+        "chemical_id": category([uid.flat_repr for uid in chems]),
+        "disease_id": category([uid.flat_repr for uid in dises]),
+        "origin": category(origins),
+    })
+
+def corpus_tables(dataset):
+    """Convert a dict of Papers (or an iterator of Papers) into a dict of
+    Arrow tables, one for each of TABLE_NAMES.
+    """
+    papers = defaultdict(list)
+    sentences = defaultdict(list)
+    annotations = defaultdict(list)
+    relations = []
+    gold_relations = []
+
+    for paper in each_paper(dataset):
+        papers["pmid"].append(paper.pmid)
+        papers["title"].append(paper.title)
+        papers["abstract"].append(paper.abstract)
+
+        in_sentence = dict()
+        for i, sentence in enumerate(paper.sentences):
+            sentences["pmid"].append(paper.pmid)
+            sentences["sentence"].append(i)
+            sentences["start"].append(sentence.start)
+            sentences["stop"].append(sentence.stop)
+            sentences["text"].append(sentence.text)
+
+            for annot in sentence.annotations:
+                in_sentence[id(annot)] = i
+
+        for i, annot in enumerate(paper.annotations):
+            annotations["pmid"].append(paper.pmid)
+            annotations["annotation"].append(i)
+            annotations["sentence"].append(in_sentence.get(id(annot)))
+            annotations["start"].append(annot.start)
+            annotations["stop"].append(annot.stop)
+            annotations["stype"].append(annot.stype)
+            annotations["text"].append(annot.text)
+            annotations["uid"].append(annot.uid.flat_repr)
+
+        for origin, pairs in paper.poss_relations.items():
+            relations.extend((paper.pmid, chem, dise, origin) for chem, dise in pairs)
+
+        gold_relations.extend((rel.pmid, rel.chem, rel.dise, rel.origin)
+            for rel in paper.gold_relations)
+
+    return {
+        "papers": pa.table({
+            "pmid": pa.array(papers["pmid"], type = pa.int64()),
+            "title": pa.array(papers["title"], type = pa.string()),
+            "abstract": pa.array(papers["abstract"], type = pa.string()),
+        }),
+        "sentences": pa.table({
+            "pmid": pa.array(sentences["pmid"], type = pa.int64()),
+            "sentence": pa.array(sentences["sentence"], type = pa.int32()),
+            "start": pa.array(sentences["start"], type = pa.int32()),
+            "stop": pa.array(sentences["stop"], type = pa.int32()),
+            "text": pa.array(sentences["text"], type = pa.string()),
+        }),
+        "annotations": pa.table({
+            "pmid": pa.array(annotations["pmid"], type = pa.int64()),
+            "annotation": pa.array(annotations["annotation"], type = pa.int32()),
+            "sentence": pa.array(annotations["sentence"], type = pa.int32()),
+            "start": pa.array(annotations["start"], type = pa.int32()),
+            "stop": pa.array(annotations["stop"], type = pa.int32()),
+            "stype": category(annotations["stype"]),
+            "text": pa.array(annotations["text"], type = pa.string()),
+            "uid": pa.array(annotations["uid"], type = pa.string()),
+        }),
+        "relations": relation_table(relations),
+        "gold_relations": relation_table(gold_relations),
+    }
+
+def table_path(location, name, fmt):
+    return os.path.join(location, name + FORMATS[fmt])
+
+def save_corpus_tables(dataset, location, fmt = "arrow"):
+    """Export a parsed corpus as a directory of tables.
+
+    fmt is either "arrow" (uncompressed IPC files, for memory-mapping) or
+    "parquet". Each file is written to a unique temporary name first (see
+    file_util.atomic_path), so that readers never see a partially written
+    table, even with several exports running at once.
+    """
+    assert fmt in FORMATS, "Unknown table format: {}".format(fmt)
+    os.makedirs(location, exist_ok = True)
+
+    metadata = {b"corpus_tables_version": str(TABLES_VERSION).encode("ascii")}
+    for name, table in corpus_tables(dataset).items():
+        table = table.replace_schema_metadata(metadata)
+
+        with atomic_path(table_path(location, name, fmt)) as temp:
+            if fmt == "arrow":
+                with pa.OSFile(temp, "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+            else:
+                pq.write_table(table, temp)
+
+def load_table(location, name):
+    """Load one table, preferring the memory-mappable Arrow file."""
+    arrow_loc = table_path(location, name, "arrow")
+    if os.path.exists(arrow_loc):
+        table = pa.ipc.open_file(pa.memory_map(arrow_loc, "r")).read_all()
+    else:
+        table = pq.read_table(table_path(location, name, "parquet"), memory_map = True)
+
+    version = (table.schema.metadata or {}).get(b"corpus_tables_version", b"")
+    assert version == str(TABLES_VERSION).encode("ascii"), (
+        "{} was exported by a different version of corpus_tables!".format(name))
+
+    return table
+
+def load_corpus_tables(location, names = TABLE_NAMES):
+    """Load the exported tables of a corpus as a dict of Arrow tables.
+
+    Arrow files are memory-mapped, so the data is only read from disk as it
+    is used. Use table.to_pandas() for a DataFrame.
+    """
+    return {name: load_table(location, name) for name in names}
+
+def column_array(table, name):
+    return table.column(name).to_numpy()
+
+def relation_array(table, origin = None):
+    """A relation array (see mesh_ids) of the pmid, chem and dise columns of a
+    relation table, optionally only of the given origin.
+    """
+    if origin is not None:
+        table = table.filter(pc.equal(table.column("origin").cast(pa.string()), origin))
+
+    return make_relations(column_array(table, "pmid"),
+        column_array(table, "chem"), column_array(table, "dise"))
@@ -9,25 +9,80 @@ These data models were created to simplify the tasks of:
 3. Relationship verification
 4. Work unit generation
 """
+from bisect import bisect_right
 from collections import defaultdict
+from collections.abc import Set
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 from itertools import islice
+import os
+import pickle
 
+from .befree import read_sentence_files
+from .befree import split_records
+from .lingpipe.file_util import file_hash
 from .lingpipe.file_util import read_file
-from .lingpipe.file_util import save_file
+from .lingpipe.file_util import save_pickles
+from .lingpipe.split_sentences import SPLITTER_VERSION
 from .lingpipe.split_sentences import split_abstract
+from .mesh_ids import encode_mesh_id
+from .triggers import get_rules
+
+# bump whenever the Paper object graph changes in a way that makes
+# previously pickled corpora invalid
+SCHEMA_VERSION = 4
+
+# the modules whose code changes how a corpus is parsed
+CORPUS_MODULES = ("data_model.py", "triggers.py", "befree.py", "mesh_ids.py")
+
+# bump whenever the layout of the corpus cache file changes
+CACHE_FORMAT = 2
+
+# how thoroughly Papers check their own consistency, from most to least:
+#   strict: any failed check raises an AssertionError
+#   warn: failed checks are printed and parsing carries on
+#   off: the text, offset and relation checks are skipped entirely
+VALIDATION_LEVELS = ("strict", "warn", "off")
 
 def is_MeSH_id(uid):
-    return len(uid) == 7 and uid[0] in ["C", "D"]
+    """D003693, or one of the 10 character UIs used since 2015 (D000068877)."""
+    return len(uid) in (7, 10) and uid[0] in ["C", "D"]
+
+def failed_check(validation, message):
+    """Report a failed consistency check according to the validation level."""
+    if validation == "strict":
+        raise AssertionError(message)
+
+    print("Validation warning: {}".format(message))
 
 #-------------------------------------------------------------------------------
 
+def slot_names(cls):
+    """All of the __slots__ declared by a class and its parents."""
+    if "_slot_names" not in cls.__dict__:
+        cls._slot_names = tuple(name
+            for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get("__slots__", ())
+        )
+
+    return cls._slot_names
+
 class Base:
+    """All data model objects use __slots__ instead of a per-instance __dict__
+    to keep large corpora small in memory. Two objects are equal if all of
+    their slots are equal.
+    """
+    __slots__ = ("uid", )
+
     def __init__(self, uid):
         self.uid = uid
 
+    def state(self):
+        return tuple(getattr(self, name, None) for name in slot_names(type(self)))
+
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.state() == other.state()
 
         return NotImplemented
 
@@ -41,31 +96,71 @@ class Base:
 class OntologyID(Base):
     """A single identifier from an existing biomedical ontology.
 
+    OntologyIDs are interned: there is only ever one OntologyID object per
+    identifier in a process, so equality and hashing are identity checks.
+    Unpickled OntologyIDs (e.g., from a cached corpus or a worker process)
+    are looked up in the same table.
+
+    MeSH identifiers also carry their integer encoding (see mesh_ids) as
+    `code`. Other identifiers have a code of None.
+
     Training PMID 7265370 has the chemical D014527+D012492, but since it doesn't
     show up in any gold standard relation we will ignore it.
     """
-    def __init__(self, text):
-        """Create an OntologyID from a string representation."""
+    __slots__ = ("uid_type", "flat_repr", "code")
+
+    # all OntologyIDs made so far, keyed by both the text they were made from
+    # and their flat representation
+    registry = dict()
+
+    def __new__(cls, text):
+        """Create an OntologyID from a string representation, or return the
+        existing one for that identifier.
+        """
+        res = cls.registry.get(text)
+        if res is not None:
+            return res
 
         assert text.count(":") <= 1, "ID {} is misformatted!".format(text)
         assert "|" not in text
 
         if ":" in text:
-            self.uid_type, self.uid = text.split(":")
-            if self.uid_type == "MESH":
-                assert is_MeSH_id(self.uid), "{} not MeSH!".format(text)
+            uid_type, uid = text.split(":")
+            if uid_type == "MESH":
+                assert is_MeSH_id(uid), "{} not MeSH!".format(text)
         else:
-            self.uid = text
-            self.uid_type = "MESH" if is_MeSH_id(self.uid) else "unknown"
+            uid = text
+            uid_type = "MESH" if is_MeSH_id(uid) else "unknown"
+
+        flat_repr = "{}:{}".format(uid_type, uid)
+
+        res = cls.registry.get(flat_repr)
+        if res is None:
+            res = object.__new__(cls)
+            res.uid = uid
+            res.uid_type = uid_type
+            res.flat_repr = flat_repr
+            res.code = encode_mesh_id(uid) if uid_type == "MESH" else None
+
+            res = cls.registry.setdefault(flat_repr, res)
+
+        cls.registry[text] = res
+        return res
+
+    def __init__(self, text):
+        """Everything is already set up by __new__."""
+        pass
 
-        self.flat_repr = "{}:{}".format(self.uid_type, self.uid)
+    def __reduce__(self):
+        return (OntologyID, (self.flat_repr, ))
+
+    __eq__ = object.__eq__
+    __ne__ = object.__ne__
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return "<{}>: {}".format(self.__class__.__name__, self.flat_repr)
 
-    def __hash__(self):
-        return hash(self.flat_repr)
-
 
 class MultiID(Base):
     """One or more OntologyIDs used to identify an Annotation.
@@ -83,6 +178,8 @@ class MultiID(Base):
         The annotation used for a relation is "D002544|-1". No other
         annotations contain D002544 as an identifier.
     """
+    __slots__ = ("flat_repr", )
+
     def __init__(self, text):
         """Create a MultiID from a string."""
         self.uid = frozenset(OntologyID(v) for v in text.split("|"))
@@ -91,6 +188,9 @@ class MultiID(Base):
     def get_mesh_only(self):
         return (v for v in self.uid if v.uid_type == "MESH")
 
+    def has_mesh(self):
+        return any(v.uid_type == "MESH" for v in self.uid)
+
     def update_ids(self, new_id):
         """Used to update an annotation's identity during acronym resolution."""
         assert isinstance(new_id, MultiID)
@@ -105,13 +205,47 @@ class MultiID(Base):
 
 
 class Position(Base):
-    def __init__(self, text, start, stop):
-        self.text = text
+    """A span of text from start to stop.
+
+    The text itself is not stored. It is sliced out of doc, a longer string
+    which starts at position offset. On its own a Position keeps just its
+    text (offset = start), but once it belongs to a Paper, doc is the whole
+    title and abstract shared by every Position of that Paper (offset = 0).
+    """
+    __slots__ = ("doc", "offset", "start", "stop")
+
+    def __init__(self, text, start, stop, validation = "strict", doc = None):
         self.start = int(start)
         self.stop = int(stop)
 
-        assert self.start < self.stop, "{0} indicies reversed!".format(self)
-        assert len(text) == self.stop - self.start, "{0} length mismatch!".format(self)
+        if doc is None:
+            self.doc = text
+            self.offset = self.start
+        else:
+            self.attach(doc)
+
+        if validation != "off":
+            if self.start >= self.stop:
+                failed_check(validation, "{0} indicies reversed!".format(self))
+
+            if len(text) != self.stop - self.start:
+                failed_check(validation, "{0} length mismatch!".format(self))
+
+    @property
+    def text(self):
+        return self.doc[self.start - self.offset : self.stop - self.offset]
+
+    def state(self):
+        """Positions are compared by their text, not by the document it is
+        sliced out of.
+        """
+        return (self.text, ) + tuple(getattr(self, name, None)
+            for name in slot_names(type(self)) if name not in ("doc", "offset"))
+
+    def attach(self, doc):
+        """Slice the text out of the whole document from now on."""
+        self.doc = doc
+        self.offset = 0
 
     def __lt__(self, other):
         """Sort by position."""
@@ -124,10 +258,11 @@ class Position(Base):
 
 class Annotation(Position):
     """A single mention of a concept in a piece of text."""
+    __slots__ = ("stype", )
 
-    def __init__(self, uid, stype, text, start, stop):
+    def __init__(self, uid, stype, text, start, stop, validation = "strict"):
         Base.__init__(self, MultiID(uid))
-        Position.__init__(self, text, start, stop)
+        Position.__init__(self, text, start, stop, validation)
 
         self.stype = stype.lower()
         assert self.stype in ["chemical", "disease"], "Bad semtype: {}".format(self)
@@ -149,12 +284,16 @@ class Sentence(Position):
     This sentence's non-CID relations minus the CID relations true at the
     abstract level need to be verified in a sentence-level task.
     """
-    def __init__(self, pmid, idx, text, start, stop, annotations):
+    __slots__ = ("pmid", "annotations", "concepts", "poss_relations")
+
+    def __init__(self, pmid, idx, text, start, stop, annotations,
+        validation = "strict", doc = None, triggers = None):
+
         Base.__init__(self, "{}_{}".format(pmid, idx))
         self.pmid = int(pmid)
 
         # start = position of sentence in the abstract
-        Position.__init__(self, text, start, stop)
+        Position.__init__(self, text, start, stop, validation, doc)
 
         # a list of the concept annotations within this sentence
         # annotations should already be sorted at the paper stage
@@ -163,7 +302,7 @@ class Sentence(Position):
         self.concepts = self.get_unique_concepts()
 
         # generate the list of CID and non-CID relations bound to this sentence
-        self.poss_relations = self.classify_relations()
+        self.poss_relations = self.classify_relations(validation, triggers)
 
     def __repr__(self):
         return "<{}>: PMID:{} '{}'({}-{})\nAnnotations: {}\n".format(
@@ -182,20 +321,24 @@ class Sentence(Position):
 
         return res
 
-    def is_CID_relation(self, chemical, disease):
+    def is_CID_relation(self, chemical, disease, triggers = None):
         """Determine if a chemical annotation and a disease annotation follow
-        the CID structure.
+        the CID structure (see triggers).
+
+        triggers is the TriggerIndex of the document, if already made.
         """
-        return ((chemical.stop < disease.start)
-            and (disease.start - chemical.stop <= 15)
-            and ("induce" in self.text[chemical.stop - self.start :
-                disease.start - self.start].lower())
-        )
+        if triggers is None:
+            triggers = get_rules().index(self.doc)
+
+        return triggers.rules.is_cid(triggers, chemical, disease, self.offset)
 
-    def classify_relations(self):
+    def classify_relations(self, validation = "strict", triggers = None):
         """Classify all unique chemical-disease identifier pairs in this
         sentence as CID or non-CID relations.
 
+        triggers is the TriggerIndex of the whole document, which all the
+        sentences of a Paper share so that the document is only scanned once.
+
         The CID and non-CID relation identifier pairs are mutually exclusive.
         Only MeSH identifiers will be generated, since the gold standard only
         lists relations between MeSH concepts. Any non-MeSH concepts can be
@@ -209,10 +352,19 @@ class Sentence(Position):
                         yield (concept, annot)
 
         all_relations = defaultdict(set)
-        for chem_id, chem_annot in select("chemical"):
-            for dise_id, dise_annot in select("disease"):
-                is_cid = self.is_CID_relation(chem_annot, dise_annot)
-                all_relations[is_cid].add((chem_id, dise_id))
+
+        if self.concepts["chemical"] and self.concepts["disease"]:
+            chemicals = list(select("chemical"))
+            diseases = list(select("disease"))
+
+            if triggers is None:
+                triggers = get_rules().index(self.doc)
+
+            is_cid = triggers.rules.is_cid
+            for chem_id, chem_annot in chemicals:
+                for dise_id, dise_annot in diseases:
+                    key = is_cid(triggers, chem_annot, dise_annot, self.offset)
+                    all_relations[key].add((chem_id, dise_id))
 
         """
         In cases where we have a sentence with the following annotations:
@@ -224,7 +376,9 @@ class Sentence(Position):
         larger non-CID set.
         """
         all_relations[False] -= all_relations[True]
-        assert all_relations[False].isdisjoint(all_relations[True])
+        if validation != "off" and not all_relations[False].isdisjoint(all_relations[True]):
+            failed_check(validation, "{} CID and non-CID relations overlap!".format(self.uid))
+
         return all_relations
 
 
@@ -234,6 +388,8 @@ class Relation(Base):
     Relations contain information about whether the two concepts ever cooccurred
     within the same sentence.
     """
+    __slots__ = ("pmid", "chem", "dise", "origin")
+
     def __init__(self, pmid, chem_id, dise_id, origin):
         self.pmid = int(pmid)
 
@@ -255,13 +411,61 @@ class Relation(Base):
         return hash((self.pmid, self.chem, self.dise, self.origin))
 
 
+class AbstractRelations(Set):
+    """The chemical-disease identifier pairs of a paper which never occur
+    together in a sentence.
+
+    This is every unique chemical identifier paired with every unique disease
+    identifier, minus the sentence-bound pairs. Rather than building the whole
+    Cartesian product, only the two sets of identifiers and the sentence-bound
+    pairs are kept. The set supports len(), membership tests, iteration and the
+    usual read-only set operations (which return regular sets).
+    """
+    __slots__ = ("chemicals", "diseases", "bound")
+
+    def __init__(self, chemicals, diseases, bound):
+        """All of the sentence-bound pairs must be made of the given chemicals
+        and diseases.
+        """
+        self.chemicals = frozenset(chemicals)
+        self.diseases = frozenset(diseases)
+        self.bound = frozenset(bound)
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+    def __contains__(self, pair):
+        try:
+            chem, dise = pair
+            return (chem in self.chemicals and dise in self.diseases
+                and pair not in self.bound)
+        except (TypeError, ValueError):
+            return False
+
+    def __len__(self):
+        return len(self.chemicals) * len(self.diseases) - len(self.bound)
+
+    def __iter__(self):
+        for chem in self.chemicals:
+            for dise in self.diseases:
+                if (chem, dise) not in self.bound:
+                    yield (chem, dise)
+
+    def __repr__(self):
+        return "<{}>: {} chemicals x {} diseases - {} sentence-bound".format(
+            self.__class__.__name__, len(self.chemicals), len(self.diseases),
+            len(self.bound))
+
+
 class Paper:
     """A single academic abstract.
 
     Contains:
         1. The PubMed identifier as an integer.
-        2. The title as a string.
-        3. The abstract as a string.
+        2. The title and abstract joined by a space as one string (text). The
+            title and the abstract are sliced out of it when needed.
+        3. The position where the title ends.
         4. A list of all chemical and disease annotations in the title and
             abstract sorted in increasing order of starting index.
         5. A potentially empty list of gold standard CID relations.
@@ -274,32 +478,59 @@ class Paper:
             three mutually exclusive categories:
             - CID relations
             - Non-CID sentence-bound relations
-            - Non-sentence bound relations (by definition not CID relations)
+            - Non-sentence bound relations (by definition not CID relations),
+                stored implicitly as an AbstractRelations set
 
             The sum of relations in all three groups should equal the number of
             unique chemical IDs times the number of unique disease IDs.
         10. A function for resolving acronyms.
+
+    If the abstract has already been split into sentences (e.g., in bulk for
+    a whole corpus), the sentences can be passed in to skip the splitter.
+
+    The validation level (see VALIDATION_LEVELS) controls whether the
+    annotation offsets, sentence offsets and relation groups are checked.
+    Once a corpus is known to be consistent, "off" skips all of that work.
+
+    CID relations are found with the given TriggerRules, or the shared ones
+    (see triggers.get_rules) if there are none.
     """
     def __init__(self, pmid, title, abstract, annotations,
-        gold_relations = [], fix_acronyms = False):
+        gold_relations = [], fix_acronyms = False, abstract_sentences = None,
+        validation = "strict", rules = None):
+
+        assert validation in VALIDATION_LEVELS, "Bad validation level: {}".format(validation)
 
         self.pmid = int(pmid)
-        self.title = title
-        self.abstract = abstract
+        self.text = "{} {}".format(title, abstract)
+        self.title_stop = len(title)
 
         self.annotations = sorted(annotations)
-        assert self.has_correct_annotations()
+        if validation != "off":
+            self.has_correct_annotations(validation)
+
+        for annot in self.annotations:
+            annot.attach(self.text)
+
         if fix_acronyms:
             self.resolve_acronyms()
 
         self.concepts = self.get_unique_concepts()
 
         # split sentences and generate sentence-bound relations
-        self.sentences = self.split_sentences()
-        self.poss_relations = self.classify_relations()
+        self.sentences = self.split_sentences(abstract_sentences, validation, rules)
+        self.poss_relations = self.classify_relations(validation)
 
         self.gold_relations = self.organize_gold_rels(gold_relations)
 
+    @property
+    def title(self):
+        return self.text[ : self.title_stop]
+
+    @property
+    def abstract(self):
+        return self.text[self.title_stop + 1 : ]
+
     def __repr__(self):
         return ("<{0}>: PMID {1}. {2} annotations, {3} gold relations\n"
             "{4} unique chemical ids, {5} unique disease ids\n"
@@ -309,15 +540,14 @@ class Paper:
             len(self.sentences))
         )
 
-    def has_correct_annotations(self):
+    def has_correct_annotations(self, validation = "strict"):
         """Check that the annotation indicies produce the correct text snippet.
 
         Also check that annotations do not overlap with one another.
         """
-        text = "{} {}".format(self.title, self.abstract)
         for annot in self.annotations:
-            assert text[annot.start : annot.stop] == annot.text, (
-                "Annotation {} text mismatch".format(annot))
+            if self.text[annot.start : annot.stop] != annot.text:
+                failed_check(validation, "Annotation {} text mismatch".format(annot))
 
         for i, annot in enumerate(self.annotations[:-1]):
             other = self.annotations[i + 1]
@@ -339,32 +569,40 @@ class Paper:
         are often acronyms defined earlier in the text. Assigning the acronyms
         the same MeSH identifier as the original definition improves tmChem
         performance.
+
+        Time complexity: O(M log M) where M is the number of annotations.
         """
         used = [False] * len(self.annotations)
-        full_text = "{} {}".format(self.title, self.abstract)
+        full_text = self.text
+
+        # annotations without a MeSH id, indexed by (stype, text)
+        unresolved = defaultdict(list)
+        for i, annot in enumerate(self.annotations):
+            if not annot.uid.has_mesh():
+                unresolved[(annot.stype, annot.text)].append(i)
 
         # if an abbreviation is included in parentheses, then it should
         # follow the definition annotation immediately
         for i, definition in enumerate(self.annotations[ : -1]):
-            if not used[i] and definition.uid.get_mesh_only():
+            if not used[i] and definition.uid.has_mesh():
                 acronym = self.annotations[i + 1]
 
                 if (acronym.stype == definition.stype
                     and acronym.start == definition.stop + 2
+                    and acronym.stop < len(full_text)
                     and full_text[acronym.start - 1] == "("
                     and full_text[acronym.stop] == ")"):
 
                     # found an acronym definition
 
                     used[i] = True
-                    for j, annot in enumerate(islice(self.annotations, i + 1, None)):
-                        if (annot.stype == definition.stype
-                            and not used[i + 1 + j]
-                            and not annot.uid.get_mesh_only()
-                            and annot.text == acronym.text):
 
-                            self.annotations[i + 1 + j].update_uid(definition.uid)
-                            used[i + 1 + j] = True
+                    # all later definitions come after this one, so the
+                    # earlier positions will never be needed again
+                    positions = unresolved.pop((definition.stype, acronym.text), [])
+                    for j in positions[bisect_right(positions, i) : ]:
+                        self.annotations[j].uid.update_ids(definition.uid)
+                        used[j] = True
 
     def get_unique_concepts(self):
         """Determine the unique chemical and disease identifiers for this paper.
@@ -378,16 +616,24 @@ class Paper:
 
         return res
 
-    def split_sentences(self):
+    def split_sentences(self, abstract_sentences = None, validation = "strict",
+        rules = None):
         """Split the abstract into individual sentences, and determine which
         concept annotations reside within each sentence.
 
         Time complexity: O(N + M) where N is the number of sentences and M is
         the number of annotations.
         """
-        all_sentences = [self.title] + split_abstract(self.abstract)
+        if abstract_sentences is None:
+            abstract_sentences = split_abstract(self.abstract)
+
+        all_sentences = [self.title] + abstract_sentences
 
-        full_text = "{} {}".format(self.title, self.abstract)
+        full_text = self.text
+        if rules is None:
+            rules = get_rules()
+
+        triggers = rules.index(full_text)
 
         sent_idx = 0 # starting index of current sentence
         annot_idx = 0 # index of annotation that is within current sentence
@@ -400,8 +646,11 @@ class Paper:
             # like "i.v." (e.g., PMID 10840460), we need to make sure that
             # we are checking for the first instance starting at the current
             # position (since find always finds the first instance otherwise).
-            assert full_text.find(sentence, sent_idx) == sent_idx, (
-                "PMID {0} {1} text mismatch!".format(self.pmid, sentence))
+            if (validation != "off"
+                and full_text.find(sentence, sent_idx) != sent_idx):
+
+                failed_check(validation,
+                    "PMID {0} {1} text mismatch!".format(self.pmid, sentence))
 
             sent_stop = sent_idx + len(sentence)
 
@@ -410,14 +659,15 @@ class Paper:
                 annot_idx += 1
 
             # should be one past
-            res.append(Sentence(self.pmid, i, sentence,
-                sent_idx, sent_stop, self.annotations[start_annot : annot_idx]))
+            res.append(Sentence(self.pmid, i, sentence, sent_idx, sent_stop,
+                self.annotations[start_annot : annot_idx], validation, full_text,
+                triggers))
 
             sent_idx += len(sentence) + 1 # all sentences separated by one space
 
         return res
 
-    def classify_relations(self):
+    def classify_relations(self, validation = "strict"):
         """Classify all unique chemical-disease identifier pairs in this
         abstract into three groups:
 
@@ -425,15 +675,6 @@ class Paper:
         2. Non-CID, sentence-bound relations
         3. Relations which are not sentence bound
         """
-        def get_all_possible_relations():
-            return {
-                (chem_id, dise_id)
-                for chem_id in self.concepts["chemical"]
-                    for dise_id in self.concepts["disease"]
-            }
-
-        all_rels = get_all_possible_relations()
-
         cid_rels = set()
         sentence_rels = set()
         for sentence in self.sentences:
@@ -441,13 +682,24 @@ class Paper:
             sentence_rels |= sentence.poss_relations[False]
 
         sentence_rels -= cid_rels
-        abs_rels = all_rels - cid_rels - sentence_rels
 
-        assert cid_rels.isdisjoint(sentence_rels)
-        assert cid_rels.isdisjoint(abs_rels)
-        assert abs_rels.isdisjoint(sentence_rels)
+        chemicals = self.concepts["chemical"]
+        diseases = self.concepts["disease"]
+
+        # the abstract-level relations are everything else, so the three groups
+        # cover all possible relations as long as the sentence-bound pairs are
+        # made of this paper's concepts
+        bound = cid_rels | sentence_rels
+        if validation != "off":
+            if not cid_rels.isdisjoint(sentence_rels):
+                failed_check(validation,
+                    "PMID {} CID and sentence relations overlap!".format(self.pmid))
+
+            if not all(chem in chemicals and dise in diseases for chem, dise in bound):
+                failed_check(validation,
+                    "PMID {} has relations with unknown concepts!".format(self.pmid))
 
-        assert all_rels == cid_rels | sentence_rels | abs_rels
+        abs_rels = AbstractRelations(chemicals, diseases, bound)
 
         return {
             "CID": cid_rels,
@@ -468,27 +720,52 @@ class Paper:
             for chem, dise in gold_rels]
 
 
-def parse_input(loc, fname, fix_acronyms = True):
-    """Parse a PubTator formatted file and return a dict of Paper objects."""
+def pubtator_blocks(path):
+    """Lazily split a PubTator formatted file into its records.
+
+    Yields (line number, lines) for each record, where line number is the
+    index of the record's first line in the file and lines are its raw lines.
+    The last record is kept even if the file does not end with a blank line.
+    """
+    loc, fname = os.path.split(path)
+
+    first = 0
+    lines = []
+    for i, line in enumerate(read_file(fname, loc)):
+        if line:
+            if not lines:
+                first = i
+
+            lines.append(line)
+        elif lines:
+            yield (first, lines)
+            lines = []
+
+    if lines:
+        yield (first, lines)
+
+def block_pmid(lines):
+    return int(lines[0].split("|", 1)[0])
+
+def block_hash(lines):
+    """SHA-1 hex digest of the raw lines of one PubTator record."""
+    return hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()
+
+def parse_record(first, lines, validation = "strict"):
+    """Parse the raw lines of one PubTator record (see pubtator_blocks) into a
+    (pmid, title, abstract, annotations, relations) tuple.
+    """
+    assert len(lines) >= 2, "Record without an abstract on line {}".format(first+1)
 
-    papers = dict()
-    counter = 0
     annotations = []
     relations = []
-    for i, line in enumerate(read_file(fname, loc)):
-        if not line:
-            papers[pmid] = Paper(pmid, title, abstract, annotations,
-                relations, fix_acronyms = fix_acronyms)
-
-            counter = -1
-            annotations = []
-            relations = []
-        elif counter < 2:
+    for i, line in enumerate(lines, first):
+        if i - first < 2:
             vals = line.split('|')
             assert len(vals) == 3, "Bad format for line {}".format(i+1)
-            assert vals[1] == ["t", "a"][counter]
+            assert vals[1] == ["t", "a"][i - first]
 
-            if counter == 0:
+            if i == first:
                 pmid = int(vals[0])
                 title = vals[2]
             else:
@@ -505,21 +782,225 @@ def parse_input(loc, fname, fix_acronyms = True):
                     vals.append("-1")
 
                 assert 6 <= len(vals) <= 7, "Error on line {0}".format(i+1)
-                annotations.append(Annotation(vals[5], vals[4], vals[3], vals[1], vals[2]))
+                annotations.append(Annotation(vals[5], vals[4], vals[3],
+                    vals[1], vals[2], validation))
+
+    return (pmid, title, abstract, annotations, relations)
+
+def read_pubtator(path, pmids = None, validation = "strict"):
+    """Lazily read the records of a PubTator formatted file.
+
+    Yields (pmid, title, abstract, annotations, relations) tuples one at a time.
+    The last record is kept even if the file does not end with a blank line.
+    If given a set of PMIDs, all other records are skipped without parsing
+    their annotations.
+    """
+    for first, lines in pubtator_blocks(path):
+        if pmids is None or block_pmid(lines) in pmids:
+            yield parse_record(first, lines, validation)
+
+def make_paper(args):
+    """Build one Paper from a parsed PubTator record (used by worker pools)."""
+    (pmid, title, abstract, annotations, relations), sentences, fix_acronyms, validation, rules = args
+    return Paper(pmid, title, abstract, annotations, relations,
+        fix_acronyms = fix_acronyms, abstract_sentences = sentences,
+        validation = validation, rules = rules)
+
+def iter_papers(path, pmids = None, fix_acronyms = True, batch_size = 100,
+    validation = "strict", sentence_files = (), rules = None):
+
+    """Lazily parse a PubTator formatted file one Paper at a time.
+
+    Only batch_size records are held in memory at once, and each batch is
+    sentence split in one round. If given a set of PMIDs, only those Papers
+    are made. See parse_input for sentence_files and rules.
+    """
+    if rules is None:
+        rules = get_rules()
 
-        counter += 1
+    known_sentences = read_sentence_files(sentence_files)
+
+    records = read_pubtator(path, pmids, validation)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+
+        all_sentences = split_records(batch, known_sentences)
+        for record, sentences in zip(batch, all_sentences):
+            yield make_paper((record, sentences, fix_acronyms, validation, rules))
+
+def each_paper(dataset):
+    """Loop over the Papers in either a dict keyed by PMID or an iterator of
+    Papers (e.g., from iter_papers).
+    """
+    if isinstance(dataset, dict):
+        return iter(dataset.values())
+
+    return iter(dataset)
+
+def parse_input(loc, fname, fix_acronyms = True, workers = 1,
+    validation = "strict", sentence_files = (), rules = None):
+    """Parse a PubTator formatted file and return a dict of Paper objects.
+
+    All of the abstracts are sentence split in one batch before any of the
+    Paper objects are made. If workers > 1, the Papers are built in a pool of
+    that many processes. The result is the same as when built serially.
+
+    If given the paths of BeFree sentence-relative offset files, the sentences
+    listed there are used instead of splitting the abstracts with LingPipe
+    wherever they match the text (see befree).
+
+    CID relations are found with the given TriggerRules, or else the shared
+    ones. Either way the rules are handed to every worker, so that workers
+    started without this process's state use the same rules.
+    """
+    records = read_pubtator(os.path.join(loc, fname), validation = validation)
+    papers = build_papers(records, fix_acronyms, workers, validation,
+        read_sentence_files(sentence_files), rules)
+
+    return {paper.pmid: paper for paper in papers}
+
+def build_papers(records, fix_acronyms = True, workers = 1, validation = "strict",
+    known_sentences = None, rules = None):
+    """Make a list of Papers from parsed PubTator records (see parse_input)."""
+    records = list(records)
+    if rules is None:
+        rules = get_rules()
+
+    all_sentences = split_records(records, known_sentences or dict())
+
+    jobs = zip(records, all_sentences, [fix_acronyms] * len(records),
+        [validation] * len(records), [rules] * len(records))
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            chunksize = max(1, len(records) // (4 * workers))
+            papers = list(pool.map(make_paper, jobs, chunksize = chunksize))
+    else:
+        papers = [make_paper(job) for job in jobs]
 
     return papers
 
 
+def corpus_cache_key(loc, fname, fix_acronyms, sentence_files = (), rules = None):
+    """Everything that a cached, parsed corpus depends upon.
+
+    Any change to the input file, the parse options, the sentence splitter or
+    BeFree sentence files, the CID trigger rules, the schema version, or the
+    code of any of the CORPUS_MODULES gives a new key. rules defaults to the
+    shared TriggerRules, as in parse_input.
+    """
+    if rules is None:
+        rules = get_rules()
+
+    src_dir = os.path.dirname(os.path.realpath(__file__))
+    return {
+        "schema": SCHEMA_VERSION,
+        "code": [file_hash(os.path.join(src_dir, name)) for name in CORPUS_MODULES],
+        "splitter": SPLITTER_VERSION,
+        "input": file_hash(os.path.join(loc, fname)),
+        "fix_acronyms": fix_acronyms,
+        "triggers": rules.key(),
+        "sentence_files": [file_hash(path) for path in sentence_files],
+    }
+
+def read_corpus_cache(save_loc, usable):
+    """Read the corpus cache written by parse_file.
+
+    The cache holds two pickles: a header with the key, the validation level
+    and the hash of each record, followed by the Papers. The header is checked
+    with usable(header) before any Paper is unpickled. Returns (header, papers),
+    or (None, None) if the cache doesn't exist, is out of date, or can't be
+    unpickled (e.g. Papers from an older version of this module).
+    """
+    if not os.path.exists(save_loc):
+        return (None, None)
+
+    with open(save_loc, "rb") as fin:
+        try:
+            header = pickle.load(fin)
+            if not (isinstance(header, dict) and header.get("format") == CACHE_FORMAT
+                and usable(header)):
+                return (None, None)
+
+            papers = pickle.load(fin)
+        except Exception:
+            # unpickling objects of an older schema can fail in many ways,
+            # all of which just mean that the cache is out of date
+            return (None, None)
+
+    return (header, papers)
+
 def parse_file(save_loc, **kwargs):
-    """Uses a cached version of the save file if possible."""
-    res = save_file(save_loc)
-    if res is not None:
-        return res
+    """Uses a cached version of the save file if possible.
+
+    The cached corpus is only used if it was made with the same settings (see
+    corpus_cache_key), and was validated at least as strictly as requested.
+    If only the input file has changed, then by default (incremental = True)
+    just the records which were added or changed since the cache was made are
+    parsed again, as found by the hash of each record's lines. Those Papers are
+    merged with the cached ones, and Papers of removed records are dropped.
+    Otherwise the whole input is parsed again. Either way the cache is
+    replaced atomically.
+    """
+    loc, fname = kwargs["loc"], kwargs["fname"]
+    sentence_files = kwargs.get("sentence_files", ())
+    rules = kwargs.get("rules") or get_rules()
+    key = corpus_cache_key(loc, fname, kwargs["fix_acronyms"], sentence_files, rules)
+    validation = kwargs.get("validation", "strict")
+
+    def same_settings(other):
+        return {k: v for k, v in other.items() if k != "input"} == {
+            k: v for k, v in key.items() if k != "input"}
+
+    def usable(header):
+        return (same_settings(header["key"])
+            and VALIDATION_LEVELS.index(header["validation"])
+                <= VALIDATION_LEVELS.index(validation))
+
+    cached, cached_papers = read_corpus_cache(save_loc, usable)
+
+    if cached is not None and cached["key"]["input"] == key["input"]:
+        print("Corpus cache hit: {}".format(save_loc))
+        return cached_papers
+
+    blocks = list(pubtator_blocks(os.path.join(loc, fname)))
+    hashes = {block_pmid(lines): block_hash(lines) for first, lines in blocks}
+
+    if cached is not None and kwargs.get("incremental", True):
+        old_hashes = cached["records"]
+        old_papers = cached_papers
+
+        # the corpus is only as well validated as its least validated Paper
+        validation = VALIDATION_LEVELS[max(VALIDATION_LEVELS.index(validation),
+            VALIDATION_LEVELS.index(cached["validation"]))]
+
+        print("Corpus cache update: {} ({} added, {} changed, {} removed)".format(
+            save_loc, len(hashes.keys() - old_hashes.keys()),
+            sum(1 for pmid, value in hashes.items()
+                if pmid in old_hashes and old_hashes[pmid] != value),
+            len(old_hashes.keys() - hashes.keys())))
+    else:
+        old_hashes = dict()
+        old_papers = dict()
+
+        print("Corpus cache miss: {} ({})".format(save_loc,
+            "out of date" if os.path.exists(save_loc) else "not found"))
+
+    rebuild = {pmid for pmid, value in hashes.items() if old_hashes.get(pmid) != value}
+    records = (parse_record(first, lines, validation) for first, lines in blocks
+        if block_pmid(lines) in rebuild)
+
+    new_papers = {paper.pmid: paper for paper in build_papers(records,
+        kwargs["fix_acronyms"], kwargs.get("workers", 1), validation,
+        read_sentence_files(sentence_files), rules)}
+
+    res = {pmid: new_papers[pmid] if pmid in rebuild else old_papers[pmid]
+        for pmid in hashes}
+
+    header = {"format": CACHE_FORMAT, "key": key, "validation": validation,
+        "records": hashes}
 
-    res = parse_input(kwargs["loc"], kwargs["fname"],
-        fix_acronyms = kwargs["fix_acronyms"])
+    save_pickles(save_loc, header, res)
 
-    save_file(save_loc, res)
     return res
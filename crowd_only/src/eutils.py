@@ -0,0 +1,87 @@
+"""
+Batched access to the NCBI E-utilities.
+
+All requests go through one requests.Session, so connections are pooled
+and kept alive between calls. efetch requests are POSTed with up to
+BATCH_SIZE PMIDs each, and the PubmedArticleSet that comes back is
+parsed as it streams in, one PubmedArticle at a time.
+
+The base URL can be changed with set_base_url, e.g. to point at a local
+server which serves canned responses in tests.
+"""
+import xml.etree.ElementTree as ET
+
+import requests
+
+DEFAULT_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+
+# NCBI asks for a POST when there are more than about 200 ids
+BATCH_SIZE = 200
+
+_base_url = DEFAULT_BASE
+_session = None
+
+def get_base_url():
+    return _base_url
+
+def set_base_url(url):
+    """Send all E-utilities requests to another server."""
+    global _base_url
+    _base_url = url if url.endswith("/") else url + "/"
+
+def get_session():
+    """The shared requests.Session, made on first use."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+
+    return _session
+
+def query_ncbi(eutil, params):
+    """GET one E-utility and return the response text."""
+    resp = get_session().get(get_base_url() + eutil, params = params)
+
+    assert resp.status_code == requests.codes.ok, "Response code #{}".format(
+        resp.status_code
+    )
+    return resp.text
+
+def batches(values, size):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+def iter_pubmed_articles(pmids, batch_size = BATCH_SIZE):
+    """Fetch many PubMed records with as few efetch calls as possible.
+
+    Yields (pmid, PubmedArticle element) as each article is parsed. Each
+    element is cleared as soon as the caller moves on to the next one, so
+    use it before then. PMIDs which PubMed does not return are skipped.
+    """
+    for batch in batches(pmids, batch_size):
+        data = {
+            "db": "pubmed",
+            "id": ",".join(str(pmid) for pmid in batch),
+            "retmode": "xml",
+            "rettype": "abstract",
+        }
+
+        resp = get_session().post(get_base_url() + "efetch.fcgi", data = data,
+            stream = True)
+
+        with resp:
+            assert resp.status_code == requests.codes.ok, "Response code #{}".format(
+                resp.status_code
+            )
+
+            resp.raw.decode_content = True
+
+            context = ET.iterparse(resp.raw, events = ("start", "end"))
+            event, root = next(context)
+
+            for event, elem in context:
+                if event == "end" and elem.tag == "PubmedArticle":
+                    yield (int(elem.find("./MedlineCitation/PMID").text), elem)
+
+                    elem.clear()
+                    root.clear()
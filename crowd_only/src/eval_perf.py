@@ -2,13 +2,25 @@
 # Last updated: 2016-01-07
 
 from collections import defaultdict
-from itertools import groupby
+import numpy as np
 import pandas as pd
 
 from .F_score import F_score
-from .mesh_filter import filter_relations
-#from .data_model import Simple_Rel
-from .data_model import OntologyID
+from .data_model import each_paper
+from .mesh_ids import encode_mesh_ids
+from .mesh_ids import encode_relations
+from .mesh_ids import make_relations
+from .mesh_filter import removal_scores
+
+def get_gold_rels(dataset):
+    """Get the (pmid, chemical_id, disease_id) triples of every gold standard
+    relation in a dict of Papers or an iterator of Papers.
+    """
+    return {
+        (rel.pmid, rel.chem.flat_repr, rel.dise.flat_repr)
+        for paper in each_paper(dataset)
+            for rel in paper.gold_relations
+    }
 
 def get_triples(dataframe):
     TRIPLE = ["pmid", "chemical_id", "disease_id"]
@@ -18,10 +30,24 @@ def get_triples(dataframe):
         )
     )
 
+def get_relation_array(dataframe):
+    """Encode the (pmid, chemical_id, disease_id) of every row of a dataframe
+    as a relation array (see mesh_ids), keeping the row order and duplicates.
+
+    Identifiers which aren't MeSH ids (e.g. CHEBI ids) get negative codes, so
+    that those rows never match a gold relation and count as false positives.
+    """
+    return make_relations(
+        dataframe["pmid"].astype(np.int64).values,
+        encode_mesh_ids(dataframe["chemical_id"], allow_other = True),
+        encode_mesh_ids(dataframe["disease_id"], allow_other = True)
+    )
+
 def performance(gold, predict, human_readable = False):
     """Calculates precision, recall, and F1 score.
 
-    Given two sets of data objects, calculates as follows:
+    Given two sets of data objects, or two duplicate free relation arrays
+    (see mesh_ids), calculates as follows:
 
     A = gold, P = predict
 
@@ -34,60 +60,82 @@ def performance(gold, predict, human_readable = False):
     r=tp/(tp+fn)
     f=(2∙p∙r)/(p+r)
     """
-    assert isinstance(gold, set)
-    assert isinstance(predict, set)
-
-    tp = gold & predict
-    fp = predict - gold
-    fn = gold - predict
-
-    precision = len(tp) / (len(tp) + len(fp))
-    recall = len(tp) / (len(tp) + len(fn))
+    if isinstance(gold, np.ndarray):
+        assert isinstance(predict, np.ndarray)
+        tp = len(np.intersect1d(gold, predict, assume_unique = True))
+    else:
+        assert isinstance(gold, set)
+        assert isinstance(predict, set)
+        tp = len(gold & predict)
+
+    return counts_performance(tp, len(predict) - tp, len(gold) - tp, human_readable)
+
+def counts_performance(tp, fp, fn, human_readable = False):
+    """Precision, recall and F1 score from the number of true positives, false
+    positives and false negatives.
+    """
+    precision = tp / (tp + fp)
+    recall = tp / (tp + fn)
     f1 = F_score(precision, recall)
 
     if not human_readable:
         return (precision, recall, f1)
 
-    print("# True pos: {0}".format(len(tp)))
-    print("# False pos: {0}".format(len(fp)))
-    print("# False neg: {0}".format(len(fn)))
+    print("# True pos: {0}".format(tp))
+    print("# False pos: {0}".format(fp))
+    print("# False neg: {0}".format(fn))
 
     print("Precision: {0}\nRecall: {1}\nF-score: {2}".format(precision, recall, f1))
 
 
-def official_F_score(score_column, gold_rel_set, dataframe, apply_mesh_filter = False):
-#    def apply_filter(predict):
-#        """Apply MeSH Ontology filter."""
-#        res = set()
-#
-#        # group by pmid
-#        temp = sorted(list(predict), key = lambda val: val[0])
-#        for pmid, group in groupby(temp, lambda val: val[0]):
-#            rels = [Simple_Rel(pmid, OntologyID(chem), OntologyID(dise)) for info, chem, dise in group]
-#            filtered = filter_relations(rels)
-#            filtered = [(rel.pmid, rel.chemical.flat_repr, rel.disease.flat_repr) for rel in filtered]
-#
-#            res |= set(filtered)
-#
-#        return res
+def official_F_score(score_column, gold_rel_set, dataframe, apply_mesh_filter = False,
+    hierarchy = None):
+    """Precision, recall and F score at every threshold of score_column.
+
+    The gold standard is either a set of (pmid, chemical_id, disease_id)
+    triples or a relation array, e.g. from an exported gold_relations table
+    (see corpus_tables.relation_array).
 
+    With apply_mesh_filter, predicted relations to a disease are dropped at
+    the thresholds where more specific diseases are predicted for the same
+    chemical (see mesh_filter.removal_scores), using the given MeshHierarchy
+    or the shared one.
+    """
     EPSILON = 0.0000001
 
-    res = defaultdict(list)
-    for threshold in dataframe[score_column].unique():
-        sub = dataframe.query("{0} > {1} or -{2} <= {0} - {1} <= {2}".format(score_column, threshold, EPSILON))
+    # encode everything once, and give each unique predicted relation the
+    # best score of any of its rows, since a relation is predicted at a
+    # threshold as soon as one of its rows passes
+    if isinstance(gold_rel_set, np.ndarray):
+        gold = np.unique(gold_rel_set)
+    else:
+        gold = encode_relations(gold_rel_set)
+    predict, row_rel = np.unique(get_relation_array(dataframe), return_inverse = True)
+
+    score = np.full(len(predict), -np.inf)
+    np.fmax.at(score, row_rel.ravel(), dataframe[score_column].values)
 
-        # grab the relation ids we guessed
-        predict = get_triples(sub)
+    is_gold = np.isin(predict, gold)
 
-#        if apply_mesh_filter:
-#            predict = apply_filter(predict)
+    def passes(values, threshold):
+        return (values > threshold) | (np.abs(values - threshold) <= EPSILON)
+
+    if apply_mesh_filter:
+        removed_at = removal_scores(predict, score, hierarchy)
+
+    res = defaultdict(list)
+    for threshold in dataframe[score_column].unique():
+        chosen = passes(score, threshold)
+        if apply_mesh_filter:
+            chosen &= ~passes(removed_at, threshold)
 
-        precision, recall, f1 = performance(gold_rel_set, predict)
+        tp = np.count_nonzero(chosen & is_gold)
+        fp = np.count_nonzero(chosen) - tp
+        precision, recall, f1 = counts_performance(tp, fp, len(gold) - tp)
 
         res["recall"].append(recall)
         res["precision"].append(precision)
         res["threshold"].append(threshold)
         res["F_score"].append(f1)
 
-    return pd.DataFrame(res).sort("threshold").reset_index(drop = True)
+    return pd.DataFrame(res).sort_values("threshold").reset_index(drop = True)
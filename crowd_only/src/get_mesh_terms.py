@@ -5,17 +5,11 @@
 from collections import defaultdict
 import numpy as np
 import pandas as pd
-import requests
-import xml.etree.cElementTree as ET
+import xml.etree.ElementTree as ET
 
-def query_ncbi(eutil, params):
-    BASE = "http://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-    resp = requests.get(BASE + eutil, params = params)
-
-    assert resp.status_code == requests.codes.ok, "Response code #{}".format(
-        resp.status_code
-    )
-    return resp.text
+from .eutils import BATCH_SIZE
+from .eutils import iter_pubmed_articles
+from .eutils import query_ncbi
 
 def get_pubmed_article_xml_tree(pubmed_id):
     params = {
@@ -33,8 +27,10 @@ class Article:
 
     Given a PubMed identifier, queries PubMed's API to grab relevant info.
     """
-    def __init__(self, pmid):
-        """Creates an article summary by querying the PubMed API."""
+    def __init__(self, pmid, tree = None):
+        """Creates an article summary by querying the PubMed API, or from an
+        already fetched PubmedArticle element.
+        """
 
         def get_publication_type():
             """Parse out publication type classifications"""
@@ -72,8 +68,10 @@ class Article:
 
         self.pmid = int(pmid)
 
-        tree = get_pubmed_article_xml_tree(pmid)
-        loc = tree.find("./PubmedArticle/MedlineCitation/Article")
+        if tree is None:
+            tree = get_pubmed_article_xml_tree(pmid).find("./PubmedArticle")
+
+        loc = tree.find("./MedlineCitation/Article")
 
         # get the title
         node = loc.find("./ArticleTitle")
@@ -98,3 +96,11 @@ class Article:
     def __repr__(self):
         return "<{}>: PMID:{}. '{}'\n{} MeSH terms".format(self.__class__.__name__,
             self.pmid, self.title, len(self.mesh_terms))
+
+
+def get_articles(pmids, batch_size = BATCH_SIZE):
+    """Article summaries of many PMIDs, fetched batch_size PMIDs per request.
+    Returns a dict keyed by integer PMID.
+    """
+    return {pmid: Article(pmid, tree)
+        for pmid, tree in iter_pubmed_articles(pmids, batch_size)}
@@ -1,18 +1,16 @@
 # Tong Shu Li
 # Last updated: 2015-10-13
 
-import requests
-import xml.etree.cElementTree as ET
+import xml.etree.ElementTree as ET
 #from unicode_to_ascii import convert_unicode_to_ascii
 
-def query_ncbi(url):
-    BASE = "http://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
-    response = requests.get(BASE + url)
-    return response.text
+from .eutils import BATCH_SIZE
+from .eutils import iter_pubmed_articles
+from .eutils import query_ncbi
 
 def get_pubmed_article_xml_tree(pubmed_id):
-    request = "efetch.fcgi?db=pubmed&id={0}&rettype=abstract".format(pubmed_id)
-    response = query_ncbi(request)
+    params = {"db": "pubmed", "id": pubmed_id, "rettype": "abstract"}
+    response = query_ncbi("efetch.fcgi", params)
     return ET.fromstring(response)
 
 def parse_article_xml_tree(article_xml_tree):
@@ -46,8 +44,7 @@ def split_abstract(abstract_xml_tree):
 
     return abstract_chunks
 
-def get_abstract_information(pubmed_id):
-    article_xml_tree = get_pubmed_article_xml_tree(pubmed_id)
+def abstract_information(article_xml_tree):
     title, abstract_xml_tree = parse_article_xml_tree(article_xml_tree)
 
     if abstract_xml_tree:
@@ -55,13 +52,24 @@ def get_abstract_information(pubmed_id):
 
     return (title, [])
 
+def get_abstract_information(pubmed_id):
+    return abstract_information(get_pubmed_article_xml_tree(pubmed_id))
+
+def get_abstracts(pubmed_ids, batch_size = BATCH_SIZE):
+    """Fetch the (title, abstract chunks) of many papers, batch_size PMIDs per
+    request. Returns a dict keyed by integer PMID.
+    """
+    return {pmid: abstract_information(article)
+        for pmid, article in iter_pubmed_articles(pubmed_ids, batch_size)}
+
 def main():
 #    unit tests:
     tests = ["25696805", "17284678", "24885308", "22417663",
         "21269880", "2491759", "17360108", "11330043"]
 
+    abstracts = get_abstracts(tests)
     for pmid in tests:
-        title, abstract = get_abstract_information(pmid)
+        title, abstract = abstracts[int(pmid)]
         print(title)
         print(abstract)
 
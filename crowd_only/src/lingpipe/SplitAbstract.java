@@ -10,6 +10,16 @@
  *
  * Input and output files are passed to the program as
  * command line arguments.
+ *
+ * When started with the single argument "-server", the program
+ * instead stays alive and answers requests on stdin/stdout so
+ * that the JVM only needs to start once per run. Each request is
+ * a line containing the number of bytes N in the abstract,
+ * followed by N bytes of UTF-8 text. Each response is a line
+ * containing the number of sentences K, followed by K lines of
+ * "start end" character offsets into the abstract. Offsets
+ * count Unicode code points, not UTF-16 chars. The server exits
+ * when stdin is closed.
  */
 import com.aliasi.chunk.Chunk;
 import com.aliasi.chunk.Chunking;
@@ -38,6 +48,12 @@ public class SplitAbstract
 
     public static void main(String[] args) throws IOException
     {
+        if (args.length == 1 && args[0].equals("-server"))
+        {
+            serve(System.in, System.out);
+            return;
+        }
+
         File in_file = new File(args[0]);
         String text = Files.readFromFile(in_file, "UTF-8");
 
@@ -73,4 +89,58 @@ public class SplitAbstract
             System.out.println("Could not write to file");
         }
     }
+
+    /*
+     * Reads one request header line. Returns -1 if stdin was closed.
+     */
+    static int readHeader(InputStream in) throws IOException
+    {
+        StringBuilder header = new StringBuilder();
+        int c;
+        while ((c = in.read()) != '\n')
+        {
+            if (c == -1)
+            {
+                if (header.length() == 0)
+                    return -1;
+
+                throw new EOFException("Truncated request header");
+            }
+
+            header.append((char) c);
+        }
+
+        return Integer.parseInt(header.toString().trim());
+    }
+
+    static void serve(InputStream stdin, OutputStream stdout) throws IOException
+    {
+        DataInputStream in = new DataInputStream(new BufferedInputStream(stdin));
+        Writer out = new BufferedWriter(new OutputStreamWriter(stdout, "UTF-8"));
+
+        int num_bytes;
+        while ((num_bytes = readHeader(in)) != -1)
+        {
+            byte[] buffer = new byte[num_bytes];
+            in.readFully(buffer);
+            String text = new String(buffer, "UTF-8");
+
+            Chunking chunking = SENTENCE_CHUNKER.chunk(text.toCharArray(), 0, text.length());
+            Set<Chunk> sentences = chunking.chunkSet();
+
+            out.write(sentences.size() + "\n");
+
+            Iterator<Chunk> it = sentences.iterator();
+            while (it.hasNext())
+            {
+                Chunk sentence = it.next();
+                int start = text.codePointCount(0, sentence.start());
+                int end = start + text.codePointCount(sentence.start(), sentence.end());
+
+                out.write(start + " " + end + "\n");
+            }
+
+            out.flush();
+        }
+    }
 }
@@ -3,9 +3,12 @@ Tong Shu Li
 Last updated: 2015-10-19
 """
 
+from contextlib import contextmanager
+import hashlib
 import os
 import pickle
 import shutil
+import tempfile
 
 def read_file(file_name, file_loc = os.getcwd()):
     with open(os.path.join(file_loc, file_name), "r") as file:
@@ -40,6 +43,42 @@ def save_file(location, value = None):
 
         return res
 
-    # save value to file
-    with open(location, "wb") as fout:
-        pickle.dump(value, fout)
+    save_pickles(location, value)
+
+@contextmanager
+def atomic_path(location):
+    """A temporary path to write a new version of location to.
+
+    The temporary file is in the same directory with a unique name, and
+    replaces location when the block finishes, so that readers never see a
+    half written file and concurrent writers never share a temporary file.
+    If the block fails, the temporary file is removed instead.
+    """
+    loc, fname = os.path.split(os.path.abspath(location))
+    fd, temp_name = tempfile.mkstemp(prefix = fname + ".", suffix = ".tmp", dir = loc)
+    os.close(fd)
+    try:
+        yield temp_name
+        os.replace(temp_name, location)
+    except BaseException:
+        os.remove(temp_name)
+        raise
+
+def save_pickles(location, *values):
+    """Pickle several objects one after the other into one file.
+
+    Read them back in order with repeated pickle.load calls on the same file.
+    """
+    with atomic_path(location) as temp_name:
+        with open(temp_name, "wb") as fout:
+            for value in values:
+                pickle.dump(value, fout)
+
+def file_hash(location):
+    """SHA-1 hex digest of a file's contents."""
+    res = hashlib.sha1()
+    with open(location, "rb") as fin:
+        for block in iter(lambda: fin.read(1 << 20), b""):
+            res.update(block)
+
+    return res.hexdigest()
@@ -0,0 +1,120 @@
+"""
+A persistent cache of sentence splits.
+
+Results are keyed by a hash of the splitter version and the
+abstract text, so the same abstract is only ever sent to
+LingPipe once no matter which corpus file it came from.
+
+The cache is a SQLite database, which lets several processes
+read and write it at the same time. The number of entries is
+bounded, and the least recently used entries are evicted first.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class SplitCache:
+    """An on-disk, size-bounded LRU cache of sentence offsets."""
+
+    BATCH = 500 # max number of keys per SQL statement
+
+    def __init__(self, location, version, max_entries = 500000):
+        self.location = location
+        self.version = version
+        self.max_entries = max_entries
+
+        self.conn = None
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def key(self, abstract):
+        text = "{}\n{}".format(self.version, abstract)
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def check_fork(self):
+        """SQLite connections must not be carried across a fork, so a forked
+        child opens its own.
+        """
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.lock = threading.Lock()
+            self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            cache_dir = os.path.dirname(self.location)
+            if cache_dir:
+                os.makedirs(cache_dir, exist_ok = True)
+
+            self.conn = sqlite3.connect(self.location, timeout = 60,
+                check_same_thread = False)
+
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS splits "
+                "(key TEXT PRIMARY KEY, spans TEXT, last_used REAL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS lru ON splits (last_used)")
+            self.conn.commit()
+
+        return self.conn
+
+    def close(self):
+        self.check_fork()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def lookup(self, abstracts):
+        """Returns the cached sentence offsets for each abstract.
+
+        Abstracts which are not in the cache get None.
+        """
+        keys = [self.key(abstract) for abstract in abstracts]
+
+        found = dict()
+        self.check_fork()
+        with self.lock:
+            conn = self.connect()
+            for i in range(0, len(keys), self.BATCH):
+                batch = keys[i : i + self.BATCH]
+                rows = conn.execute("SELECT key, spans FROM splits WHERE key IN ({})".format(
+                    ",".join("?" * len(batch))), batch)
+
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                with conn:
+                    conn.executemany("UPDATE splits SET last_used = ? WHERE key = ?",
+                        ((now, key) for key in found))
+
+        return [
+            [tuple(span) for span in json.loads(found[key])] if key in found else None
+            for key in keys
+        ]
+
+    def store(self, abstracts, all_spans):
+        """Save the sentence offsets of each abstract, then evict the least
+        recently used entries if the cache has grown too large.
+        """
+        now = time.time()
+        rows = [(self.key(abstract), json.dumps(spans), now)
+            for abstract, spans in zip(abstracts, all_spans)]
+
+        self.check_fork()
+        with self.lock:
+            conn = self.connect()
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO splits VALUES (?, ?, ?)", rows)
+
+                excess = conn.execute("SELECT COUNT(*) FROM splits").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute("DELETE FROM splits WHERE key IN "
+                        "(SELECT key FROM splits ORDER BY last_used LIMIT ?)", (excess, ))
+
+    def __len__(self):
+        self.check_fork()
+        with self.lock:
+            return self.connect().execute("SELECT COUNT(*) FROM splits").fetchone()[0]
@@ -5,34 +5,270 @@ Last updated 2015-08-20
 
 Given a string representing an abstract,
 splits it into sentences using LingPipe.
+
+A single long-lived Java process is used for all abstracts
+in a run, since starting the JVM costs far more than the
+sentence splitting itself. Results are also kept in an
+on-disk cache, so abstracts which have been split before
+never reach the JVM at all.
 """
+import atexit
 import os
 import subprocess
+import threading
 
-from .file_util import read_file
+from .split_cache import SplitCache
 
-def split_abstract(abstract):
+SPLITTER_DIR = os.path.dirname(os.path.realpath(__file__))
+
+# change whenever SplitAbstract.java or the LingPipe model changes,
+# so that old cached splits are no longer used
+SPLITTER_VERSION = "lingpipe-4.1.0-medline-1"
+
+# the split cache is kept in the user's cache directory rather than next
+# to the code, unless this environment variable names another file
+CACHE_ENV = "SPLIT_CACHE"
+
+def default_cache_loc():
+    """Location of the shared split cache: $SPLIT_CACHE if it is set,
+    otherwise crowd_only/split_cache.sqlite in $XDG_CACHE_HOME or ~/.cache.
     """
-    Uses two temporary files to talk to the Java
-    LingPipe program for sentence splitting.
+    if os.environ.get(CACHE_ENV):
+        return os.environ[CACHE_ENV]
 
-    Returns a list with the individual sentences.
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache")
+
+    return os.path.join(cache_dir, "crowd_only", "split_cache.sqlite")
+
+def spans_to_sentences(abstract, spans):
+    return [abstract[start : stop] for start, stop in spans]
+
+class SentenceSplitter:
+    """A persistent Java SplitAbstract process.
+
+    Requests are framed as a header line with the number of UTF-8 bytes in
+    the abstract, followed by the abstract itself. The response is a line with
+    the number of sentences, followed by one "start end" offset pair per line.
+
+    The process is started on first use, and restarted automatically if it
+    dies in the middle of a run.
+
+    A splitter can be shared between threads, since each round of requests
+    holds a lock. After a fork, the child process starts its own Java process
+    rather than writing to its parent's pipes.
     """
-    orig_dir = os.getcwd()
-    real_dir = os.path.dirname(os.path.realpath(__file__))
+    def __init__(self, java = "java"):
+        self.java = java
+        self.proc = None
+
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def check_fork(self):
+        """Let go of the parent's Java process if we are a forked child.
+
+        The child's copies of the pipes are closed, so that the Java process
+        still sees the end of its input when the parent closes it. Only the
+        underlying files are closed: flushing requests which the parent had
+        buffered would write them to the pipe a second time.
+        """
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.lock = threading.Lock()
+
+            if self.proc is not None:
+                for pipe in (self.proc.stdin, self.proc.stdout):
+                    try:
+                        pipe.raw.close()
+                    except (OSError, ValueError):
+                        pass
+
+            self.proc = None
+
+    def start(self):
+        """Start the Java process if it is not already running."""
+        if self.is_alive():
+            return
+
+        self.close()
+        self.proc = subprocess.Popen([self.java, "SplitAbstract", "-server"],
+            cwd = SPLITTER_DIR, stdin = subprocess.PIPE, stdout = subprocess.PIPE)
+
+    def close(self):
+        """Shut down the Java process by closing its input."""
+        self.check_fork()
+        if self.proc is None:
+            return
+
+        proc, self.proc = self.proc, None
+        try:
+            proc.stdin.close()
+            proc.wait(timeout = 10)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+
+        proc.stdout.close()
+
+    def _send(self, abstracts):
+        """Write all requests to the Java process.
+
+        Runs in its own thread so that responses can be read while requests
+        are still being written, otherwise both pipes could fill up.
+        """
+        try:
+            for abstract in abstracts:
+                data = abstract.encode("utf-8")
+                self.proc.stdin.write("{}\n".format(len(data)).encode("ascii"))
+                self.proc.stdin.write(data)
+
+            self.proc.stdin.flush()
+        except (OSError, ValueError):
+            pass # the reader will notice that the process died
+
+    def _receive(self):
+        def read_line():
+            line = self.proc.stdout.readline()
+            if not line:
+                raise EOFError("Java SplitAbstract exited unexpectedly.")
+
+            return line
+
+        num_sentences = int(read_line())
+        return [tuple(map(int, read_line().split())) for i in range(num_sentences)]
+
+    def split_many_spans(self, abstracts):
+        """Returns the (start, stop) offsets of each sentence for every
+        abstract, in the same order as the abstracts.
 
-    os.chdir(real_dir)
+        All abstracts are streamed to the Java process in one go. If the
+        process dies, it is restarted and the unfinished abstracts are tried
+        one more time.
+        """
+        abstracts = list(abstracts)
 
-    in_fname = "temp_in_file.txt"
-    with open(in_fname, "w") as in_file:
-        in_file.write(abstract)
+        self.check_fork()
+        with self.lock:
+            res = []
+            for attempt in range(2):
+                self.start()
 
-    out_fname = "temp_out_file.txt"
-    res = subprocess.call(["java", "SplitAbstract", in_fname, out_fname])
-    assert res == 0, "Java SplitAbstract did not exit with code 0."
+                pending = abstracts[len(res) : ]
+                writer = threading.Thread(target = self._send, args = (pending, ))
+                writer.daemon = True
+                writer.start()
+                try:
+                    for i in range(len(pending)):
+                        res.append(self._receive())
 
-    sentences = [line for line in read_file(out_fname, real_dir)]
+                    return res
+                except (OSError, EOFError, ValueError):
+                    self.close()
+                    if attempt:
+                        raise
+                finally:
+                    writer.join()
 
-    os.chdir(orig_dir)
+    def split_spans(self, abstract):
+        """Returns the (start, stop) offsets of each sentence in the abstract."""
+        return self.split_many_spans([abstract])[0]
 
-    return sentences
+    def split(self, abstract):
+        """Returns a list with the individual sentences."""
+        return spans_to_sentences(abstract, self.split_spans(abstract))
+
+    def split_many(self, abstracts):
+        """Returns a list of sentence lists, one for each abstract."""
+        abstracts = list(abstracts)
+        return [spans_to_sentences(abstract, spans)
+            for abstract, spans in zip(abstracts, self.split_many_spans(abstracts))]
+
+
+_splitter = None
+_cache = None
+
+def get_splitter():
+    """Returns the splitter shared by the whole run."""
+    global _splitter
+    if _splitter is None:
+        _splitter = SentenceSplitter()
+        atexit.register(_splitter.close)
+
+    return _splitter
+
+def get_cache():
+    """Returns the shared sentence split cache, or None if caching is off.
+
+    The cache is opened at default_cache_loc() on first use, unless another
+    one was given to set_cache.
+    """
+    global _cache
+    if _cache is None:
+        _cache = SplitCache(default_cache_loc(), SPLITTER_VERSION)
+
+    if _cache is False:
+        return None
+
+    return _cache
+
+def set_cache(cache):
+    """Replace the shared sentence split cache.
+
+    Use set_cache(SplitCache(path, SPLITTER_VERSION)) to keep the cache
+    somewhere else, or set_cache(False) to turn caching off.
+    """
+    global _cache
+    _cache = cache
+
+def split_spans(abstracts):
+    """
+    Returns the sentence offsets for each abstract, only
+    sending the abstracts missing from the cache to LingPipe.
+    """
+    abstracts = list(abstracts)
+
+    cache = get_cache()
+    if cache is None:
+        return get_splitter().split_many_spans(abstracts)
+
+    res = cache.lookup(abstracts)
+
+    missing = [abstracts[i] for i, spans in enumerate(res) if spans is None]
+    if missing:
+        new_spans = get_splitter().split_many_spans(missing)
+        cache.store(missing, new_spans)
+
+        new_spans = iter(new_spans)
+        res = [spans if spans is not None else next(new_spans) for spans in res]
+
+    return res
+
+def split_abstract(abstract):
+    """
+    Splits one abstract with the shared LingPipe process.
+
+    Returns a list with the individual sentences.
+    """
+    return spans_to_sentences(abstract, split_spans([abstract])[0])
+
+def split_abstracts(abstracts):
+    """
+    Splits many abstracts with a single round of requests
+    to the shared LingPipe process.
+
+    Returns a list of sentence lists in the same order
+    as the abstracts.
+    """
+    abstracts = list(abstracts)
+    return [spans_to_sentences(abstract, spans)
+        for abstract, spans in zip(abstracts, split_spans(abstracts))]
@@ -7,6 +7,7 @@ Create CrowdFlower work units.
 from collections import defaultdict
 import pandas as pd
 
+from .data_model import each_paper
 from .make_sections import create_sections
 
 def add_simple_tag(tag_name, tag_class, text):
@@ -68,7 +69,11 @@ def process_sentence(chem, dise, sentence):
     return (names, form_text)
 
 def create_work_units(dataset, uniq_id):
+    """Make one work unit for every non-CID relation in the dataset.
 
+    The dataset can be a dict of Papers keyed by PMID, or any iterator of
+    Papers such as data_model.iter_papers().
+    """
     def get_rels(paper):
         for origin, rels in paper.poss_relations.items():
             if origin != "CID":
@@ -78,7 +83,8 @@ def create_work_units(dataset, uniq_id):
     cid = dict()
 
     res = defaultdict(list)
-    for pmid, paper in dataset.items():
+    for paper in each_paper(dataset):
+        pmid = paper.pmid
         cid[pmid] = paper.poss_relations["CID"]
 
         for (chem, dise), origin in get_rels(paper):
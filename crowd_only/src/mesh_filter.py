@@ -5,57 +5,58 @@ Last updated: 2016-01-07
 
 Use the MeSH hierarchy to determine which concepts are more specific.
 """
-from collections import namedtuple
-from itertools import groupby
-import os
+from collections import defaultdict
+import numpy as np
 
-from .data_model import OntologyID
-from .data_model import Relation
-from .parse_mesh import load_mesh
+from .mesh_hierarchy import expand
+from .mesh_hierarchy import get_hierarchy
+from .mesh_store import get_store
 
-concept_name, hierarchy = load_mesh("hierarchy")
+def tree_prefixes(tree_num):
+    """Every tree number on the path from the root to tree_num, inclusive.
+
+    "C12.777.419" gives "C12", "C12.777" and "C12.777.419".
+    """
+    parts = tree_num.split(".")
+    return [".".join(parts[ : i]) for i in range(1, len(parts) + 1)]
 
 def mesh_filter(concepts):
     """Removes redundant disease concepts from a list using the MeSH hierarchy.
 
     Given a list of MeSH disease IDs, removes those which are strict parents
-    (prefixes) of other concepts in the list. Returns a set of ids.
+    (prefixes) of other concepts in the list. Returns a set of ids. Concepts
+    without any tree numbers (e.g. supplementary concepts) are always kept.
 
-    N^2 runtime on the number of concepts to verify.
+    Tree numbers are visited from longest to shortest, and every prefix of a
+    kept tree number goes into one set, so that checking whether a more
+    specific concept was already kept is a single lookup. Runtime is linear
+    in the number of tree numbers times their depth.
     """
-    def redundant(tree_num):
-        for label in seen:
-            if label.startswith(tree_num):
-                return True
-
-        return False
+    store = get_store()
+    hierarchy = {concept: store.get_tree_numbers(concept) for concept in set(concepts)}
 
-    Ref = namedtuple("Ref", ["tree_num", "mesh_id"])
+    tree_nums = [(tree_num, concept) for concept, labels in hierarchy.items()
+        for tree_num in labels]
 
-    tree_nums = []
-    for concept in concepts:
-        tree_nums += [Ref(tree_num, concept) for tree_num in hierarchy[concept]]
+    tree_nums.sort(key = lambda val: len(val[0]), reverse = True)
 
-    tree_nums = sorted(tree_nums, key = lambda val: len(val.tree_num), reverse = True)
-
-    # grab each identifier one by one
-    seen = set()
-    ans = set()
+    # all prefixes of the tree numbers kept so far
+    covered = set()
+    ans = {concept for concept, labels in hierarchy.items() if not labels}
     for tree_num, concept in tree_nums:
-        if concept in ans:
-            seen.add(tree_num)
-        elif not redundant(tree_num):
+        if concept in ans or tree_num not in covered:
             ans.add(concept)
-            seen.add(tree_num)
+            covered.update(tree_prefixes(tree_num))
 
     return ans
 
 def filter_relations(relations):
-    """Filter redundant relationships from a list of Simple_Rel objects.
+    """Filter redundant relationships from a list of Relation objects.
 
     Using the MeSH ontology, redundant relations between one chemical and
     multiple diseases are removed. A relation is considered redundant if the
-    disease is a more general than another disease related to the same chemical.
+    disease is a more general than another disease related to the same chemical
+    in the same PMID.
 
     Example:
         Kidney failure, chronic (D007676) is more specific than Kidney diseases
@@ -69,16 +70,75 @@ def filter_relations(relations):
 
         Since D007674 is more general, but no more specific relation to B
         exists, and is therefore only removed when related to A.
+
+    The relations may come from any number of PMIDs. Each (pmid, chemical)
+    group is filtered once, and groups with the same diseases share the
+    result. The remaining relations are returned in their original order.
     """
+    relations = list(relations)
 
-    relations = sorted(relations, key = lambda val: val.chemical.flat_repr)
+    groups = defaultdict(set)
+    for rel in relations:
+        groups[(rel.pmid, rel.chem)].add(rel.dise.uid)
 
-    # assume all the same pmid
-    pmid = relations[0].pmid
+    done = dict()
+    kept = dict()
+    for key, diseases in groups.items():
+        if len(diseases) == 1:
+            kept[key] = diseases
+            continue
 
-    ans = []
-    for chemical, group in groupby(relations, lambda val: val.chemical):
-        diseases = mesh_filter([rel.disease.uid for rel in group])
-        ans += [Simple_Rel(pmid, chemical, Ontology_ID(disease)) for disease in diseases]
+        diseases = frozenset(diseases)
+        if diseases not in done:
+            done[diseases] = mesh_filter(diseases)
 
-    return ans
+        kept[key] = done[diseases]
+
+    return [rel for rel in relations if rel.dise.uid in kept[(rel.pmid, rel.chem)]]
+
+def removal_scores(relations, scores, hierarchy = None):
+    """The score from which on filter_relations removes each relation.
+
+    relations is a sorted, duplicate free relation array (see mesh_ids) and
+    scores the score of each relation. A relation is removed when every tree
+    number of its disease has a more specific disease related to the same
+    chemical in the same PMID. So at any threshold, the relation is removed
+    once the removal score, the lowest over its tree numbers of the highest
+    score of such a more specific relation, passes the threshold as well.
+
+    Relations which are never removed get -inf. This finds the result of the
+    filter at every threshold at once.
+    """
+    if hierarchy is None:
+        hierarchy = get_hierarchy()
+
+    num_rels = len(relations)
+    if not num_rels:
+        return np.full(0, -np.inf)
+
+    # the relations of each (pmid, chemical) group are next to each other
+    pmid = relations["pmid"]
+    chem = relations["chem"]
+    new_group = np.ones(num_rels, dtype = bool)
+    new_group[1 : ] = (pmid[1 : ] != pmid[ : -1]) | (chem[1 : ] != chem[ : -1])
+
+    starts = np.flatnonzero(new_group)
+    sizes = np.diff(np.append(starts, num_rels))
+    group = np.cumsum(new_group) - 1
+
+    dise = relations["dise"].astype(np.int64)
+    rel, tree = hierarchy.tree_numbers_of(hierarchy.concept_index(dise))
+
+    # every tree number of each disease against all relations of its group
+    k, other = expand(starts[group[rel]], sizes[group[rel]])
+    under = hierarchy.has_tree_under(tree[k], dise[other])
+
+    best = np.full(len(rel), -np.inf)
+    np.maximum.at(best, k[under], scores[other[under]])
+
+    res = np.full(num_rels, np.inf)
+    np.minimum.at(res, rel, best)
+
+    # diseases without tree numbers are always kept
+    res[res == np.inf] = -np.inf
+    return res
@@ -0,0 +1,242 @@
+"""
+Ancestry queries on the MeSH hierarchy.
+
+Every tree number gets an interval label (left, right): left is its
+position among all tree numbers in sorted order, and right is one past
+its last descendant, since the descendants of a tree number directly
+follow it (see mesh_store). Tree number p is then under tree number q
+exactly when q < p < right[q], a constant time test.
+
+A concept is a descendant of another if any of its tree numbers is
+under any of the other's. All queries take MeSH ids encoded as
+integers (see mesh_ids), either one at a time or as whole arrays of
+ids, which are answered with array operations.
+"""
+import numpy as np
+
+from .mesh_ids import decode_mesh_ids
+from .mesh_ids import encode_mesh_id
+from .mesh_ids import encode_mesh_ids
+from .mesh_store import MeshStore
+from .mesh_store import build_store
+from .mesh_store import get_store
+
+def expand(starts, counts):
+    """The index arrays (row, i) of every start[row] <= i < start[row] + count[row]."""
+    total = counts.sum()
+    row = np.repeat(np.arange(len(starts)), counts)
+    i = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(total)
+    return (row, i)
+
+def as_codes(values):
+    """Encode MeSH id strings, and pass encoded ids through, as an int64 array."""
+    values = np.atleast_1d(np.asarray(values))
+    if values.dtype.kind in "USO":
+        return encode_mesh_ids(values.tolist()).astype(np.int64)
+
+    return values.astype(np.int64)
+
+def code_or_missing(mesh_id):
+    """Encoded MeSH id, or -1 for ids that don't fit the encoding."""
+    try:
+        return encode_mesh_id(mesh_id)
+    except ValueError:
+        return -1
+
+
+class MeshHierarchy:
+    """Interval labels for all the tree numbers of a MeshStore."""
+    def __init__(self, store = None):
+        if store is None:
+            store = get_store()
+
+        arrays = store.arrays
+
+        trees = arrays["trees"]
+        self.right = np.searchsorted(trees, np.char.add(trees, b"/"))
+        self.owner = arrays["tree_owner"]
+        self.tree_offsets = arrays["id_tree_offsets"]
+        self.id_trees = arrays["id_trees"]
+
+        # parent and depth of each tree number, in one preorder walk
+        rights = self.right.tolist()
+        parent = [-1] * len(rights)
+        depth = [0] * len(rights)
+
+        stack = []
+        for pos in range(len(rights)):
+            while stack and rights[stack[-1]] <= pos:
+                stack.pop()
+
+            if stack:
+                parent[pos] = stack[-1]
+                depth[pos] = depth[stack[-1]] + 1
+
+            stack.append(pos)
+
+        self.parent = np.array(parent, dtype = np.int64)
+        self.depth = np.array(depth, dtype = np.int64)
+
+        # encoded id of each concept, and the concepts in order of their codes
+        uids = [uid.decode("ascii") for uid in arrays["ids"].tolist()]
+        self.codes = np.array([code_or_missing(uid) for uid in uids], dtype = np.int64)
+
+        # ids which can't be encoded are left out of every query
+        self.unencoded = [uid for uid, code in zip(uids, self.codes.tolist()) if code < 0]
+        if self.unencoded:
+            print("MeshHierarchy: skipped {} MeSH ids which can't be encoded, e.g. {}".format(
+                len(self.unencoded), ", ".join(self.unencoded[ : 5])))
+
+        self.code_order = np.argsort(self.codes, kind = "stable")
+        self.sorted_codes = self.codes[self.code_order]
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy):
+        """Build from a dict of MeSH id to tree numbers, e.g. the hierarchy
+        returned by parse_mesh.parse_mesh_xml.
+        """
+        records = [(mesh_id, "", list(tree_nums))
+            for mesh_id, tree_nums in hierarchy.items()]
+
+        return cls(MeshStore(build_store(records)))
+
+    def concept_index(self, codes):
+        """Position of each encoded id in the store, or -1 if it isn't there."""
+        if not len(self.sorted_codes):
+            return np.full(len(codes), -1, dtype = np.int64)
+
+        pos = np.searchsorted(self.sorted_codes, codes)
+        pos[pos == len(self.sorted_codes)] = 0
+
+        found = (self.sorted_codes[pos] == codes) & (codes >= 0)
+        return np.where(found, self.code_order[pos], -1)
+
+    def tree_numbers_of(self, concepts):
+        """(row, tree position) of every tree number of each concept index."""
+        valid = concepts >= 0
+        safe = np.where(valid, concepts, 0)
+
+        starts = self.tree_offsets[safe].astype(np.int64)
+        counts = np.where(valid, self.tree_offsets[safe + 1] - starts, 0)
+
+        row, i = expand(starts, counts)
+        return (row, self.id_trees[i].astype(np.int64))
+
+    def tree_pairs(self, left, right):
+        """Every (row, tree of left[row], tree of right[row]) combination."""
+        left_row, left_tree = self.tree_numbers_of(self.concept_index(left))
+        k, right_tree = self.tree_numbers_of(self.concept_index(right[left_row]))
+        return (left_row[k], left_tree[k], right_tree)
+
+    def depth_of(self, trees):
+        return np.where(trees >= 0, self.depth[np.maximum(trees, 0)], -1)
+
+    def parent_of(self, trees):
+        return np.where(trees >= 0, self.parent[np.maximum(trees, 0)], -1)
+
+    def is_descendant(self, descendant, ancestor):
+        """Is each descendant a strict descendant of the ancestor in the same
+        position? Takes single ids or arrays of ids, encoded or not.
+        """
+        scalar = np.ndim(descendant) == 0 and np.ndim(ancestor) == 0
+        descendant, ancestor = np.broadcast_arrays(as_codes(descendant), as_codes(ancestor))
+
+        row, lower, upper = self.tree_pairs(descendant, ancestor)
+        under = (upper < lower) & (lower < self.right[upper])
+
+        res = np.zeros(len(descendant), dtype = bool)
+        res[row[under]] = True
+        return bool(res[0]) if scalar else res
+
+    def has_tree_under(self, trees, concepts):
+        """Does each concept (encoded id) have a tree number strictly under the
+        tree number at position trees[row]?
+        """
+        row, below = self.tree_numbers_of(self.concept_index(np.asarray(concepts, dtype = np.int64)))
+        top = trees[row]
+        under = (top < below) & (below < self.right[top])
+
+        res = np.zeros(len(trees), dtype = bool)
+        res[row[under]] = True
+        return res
+
+    def is_ancestor(self, ancestor, descendant):
+        return self.is_descendant(descendant, ancestor)
+
+    def descendant_pairs(self, concepts):
+        """All strict descendants of many concepts at once.
+
+        Returns the arrays (row, code): code is the encoded id of a descendant
+        of concepts[row]. Each pair is listed once, sorted by row and code.
+        """
+        concepts = as_codes(concepts)
+
+        row, tree = self.tree_numbers_of(self.concept_index(concepts))
+        k, below = expand(tree + 1, self.right[tree] - tree - 1)
+
+        codes = self.codes[self.owner[below]]
+        known = codes >= 0
+
+        pairs = np.unique((row[k][known] << 32) | codes[known])
+        return (pairs >> 32, pairs & 0xFFFFFFFF)
+
+    def descendants(self, concept, under = None):
+        """Encoded ids of all strict descendants of one concept, optionally
+        only those which are also descendants of `under`.
+        """
+        row, codes = self.descendant_pairs(concept)
+        if under is not None:
+            codes = codes[self.is_descendant(codes, np.full(len(codes), as_codes(under)[0]))]
+
+        return codes
+
+    def lowest_common_ancestor(self, first, second):
+        """The deepest concept which is either one of the two concepts or an
+        ancestor of them both, for single ids or arrays of ids.
+
+        Concepts with several tree numbers may share ancestors on more than one
+        branch, and the one deepest in the tree wins. Returns the encoded id,
+        or -1 (None for single ids) if the two share no tree.
+        """
+        scalar = np.ndim(first) == 0 and np.ndim(second) == 0
+        first, second = np.broadcast_arrays(as_codes(first), as_codes(second))
+
+        row, x, y = self.tree_pairs(first, second)
+
+        # climb from the deeper tree number until the two meet, or both run
+        # past the root (-1)
+        apart = x != y
+        while apart.any():
+            dx, dy = self.depth_of(x), self.depth_of(y)
+            x = np.where(apart & (dx >= dy), self.parent_of(x), x)
+            y = np.where(apart & (dy >= dx), self.parent_of(y), y)
+            apart = x != y
+
+        met = x >= 0
+        row, meet = row[met], x[met]
+
+        order = np.lexsort((-self.depth[meet], row))
+        first_row, idx = np.unique(row[order], return_index = True)
+
+        res = np.full(len(first), -1, dtype = np.int64)
+        res[first_row] = self.codes[self.owner[meet[order[idx]]]]
+
+        if scalar:
+            return None if res[0] == -1 else int(res[0])
+
+        return res
+
+    def decode(self, codes):
+        """Turn encoded ids back into "D007674" strings."""
+        return decode_mesh_ids(codes, flat = False)
+
+
+_hierarchy = None
+
+def get_hierarchy():
+    """The MeshHierarchy of the shared MeshStore, built on first use."""
+    global _hierarchy
+    if _hierarchy is None:
+        _hierarchy = MeshHierarchy()
+
+    return _hierarchy
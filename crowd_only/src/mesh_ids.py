@@ -0,0 +1,117 @@
+"""
+Integer encoding of MeSH identifiers.
+
+Every MeSH descriptor (D######) and supplementary concept (C######)
+identifier is encoded as a single integer: the six digit numeric
+part shifted left by one bit, with the low bit set for C ids.
+
+The 10 character UIs which MeSH has issued since 2015 (D000068877)
+have nine digits, but so far always start with 000. They are encoded
+the same way and then offset by LONG_BASE, above every 7 character
+id, so that all codes stay below 2 ** 22.
+
+Relations are stored as NumPy records of (pmid, chem, dise), so
+that whole relation sets can be compared with NumPy set routines
+instead of Python sets of string tuples. The three fields need
+more than 64 bits together (PMIDs alone need 26), so a relation is
+a 16 byte record instead of a single packed int64.
+
+Every encoding can be decoded back to the original string format.
+
+Evaluation inputs may also hold other identifiers (e.g. CHEBI ids from
+BeFree). When asked to, these get negative codes instead, which never
+match a MeSH id and can't be decoded.
+"""
+import numpy as np
+
+REL_DTYPE = np.dtype([("pmid", "<i8"), ("chem", "<i4"), ("dise", "<i4")])
+
+SHORT_LIMIT = 10 ** 6 # the numeric part of any encoded id is below this
+LONG_BASE = SHORT_LIMIT << 1 # codes of 10 character UIs start here
+
+def encode_mesh_id(text):
+    """Encode "D003693", "D000068877" or "MESH:D003693" as an integer."""
+    if not isinstance(text, str):
+        raise ValueError("{} is not a MeSH id".format(text))
+
+    uid = text[5 : ] if text.startswith("MESH:") else text
+
+    if len(uid) not in (7, 10) or uid[0] not in "CD" or not uid[1 : ].isdigit():
+        raise ValueError("{} is not a MeSH id".format(text))
+
+    num = int(uid[1 : ])
+    if num >= SHORT_LIMIT:
+        raise ValueError("{} is outside the range of encoded MeSH ids".format(text))
+
+    code = (num << 1) | (uid[0] == "C")
+    return code + LONG_BASE if len(uid) == 10 else code
+
+def decode_mesh_id(code, flat = True):
+    """Decode an integer back to "MESH:D003693" (or "D003693" if not flat)."""
+    code = int(code)
+    if code >= LONG_BASE:
+        code -= LONG_BASE
+        uid = "{}{:09d}".format("C" if code & 1 else "D", code >> 1)
+    else:
+        uid = "{}{:06d}".format("C" if code & 1 else "D", code >> 1)
+
+    return "MESH:" + uid if flat else uid
+
+def encode_mesh_ids(values, allow_other = False):
+    """Encode a sequence of MeSH id strings as an int32 array.
+
+    Each distinct string is only parsed once. With allow_other, strings which
+    aren't MeSH ids are given distinct negative codes (-1, -2, ... in sorted
+    order) instead of raising a ValueError.
+    """
+    values = list(values)
+
+    codes = dict()
+    other = []
+    for value in set(values):
+        try:
+            codes[value] = encode_mesh_id(value)
+        except ValueError:
+            if not allow_other:
+                raise
+
+            other.append(value)
+
+    for i, value in enumerate(sorted(other, key = str)):
+        codes[value] = -(i + 1)
+
+    return np.fromiter((codes[value] for value in values), dtype = np.int32,
+        count = len(values))
+
+def decode_mesh_ids(codes, flat = True):
+    codes = np.asarray(codes)
+    names = {code: decode_mesh_id(code, flat) for code in np.unique(codes)}
+    return [names[code] for code in codes.tolist()]
+
+def make_relations(pmids, chems, dises):
+    """Build a relation array from three equal length sequences."""
+    res = np.empty(len(pmids), dtype = REL_DTYPE)
+    res["pmid"] = pmids
+    res["chem"] = chems
+    res["dise"] = dises
+    return res
+
+def encode_relations(triples):
+    """Encode (pmid, chemical_id, disease_id) string triples as a sorted,
+    duplicate free relation array.
+    """
+    triples = list(triples)
+    res = make_relations(
+        [int(pmid) for pmid, chem, dise in triples],
+        encode_mesh_ids(chem for pmid, chem, dise in triples),
+        encode_mesh_ids(dise for pmid, chem, dise in triples)
+    )
+    return np.unique(res)
+
+def decode_relations(relations, flat = True):
+    """Turn a relation array back into a set of (pmid, chem, dise) triples."""
+    return set(zip(
+        relations["pmid"].tolist(),
+        decode_mesh_ids(relations["chem"], flat),
+        decode_mesh_ids(relations["dise"], flat)
+    ))
@@ -0,0 +1,228 @@
+"""
+Compact binary store of the MeSH vocabulary.
+
+One file holds the MeSH descriptors and supplementary concepts of a
+release as a handful of flat arrays:
+
+    ids: every MeSH id ("D007674", "C000001"), sorted
+    name_offsets, names: the UTF-8 encoded name of each id
+    trees: every tree number ("C12.777.419"), sorted
+    tree_owner: the position in ids of the concept of each tree number
+    id_tree_offsets, id_trees: the positions in trees of each id's tree
+        numbers, in the order MeSH lists them
+
+Since the tree numbers are sorted, the descendants of any tree number
+directly follow it.
+
+The file starts with MAGIC, the length of a JSON header and the header
+itself, which lists the version and the dtype, shape and offset of each
+array. Arrays are aligned to 8 bytes so that they can be used straight
+out of the file.
+
+The store is memory-mapped instead of read, and only on first use (see
+get_store), so importing the modules which use MeSH costs nothing, and
+every process using the same file shares its pages.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .lingpipe.file_util import atomic_path
+
+MAGIC = b"MESHSTORE"
+
+# bump whenever the layout of the store changes
+STORE_VERSION = 1
+
+ALIGN = 8
+
+STORE_LOC = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+    "..", "data", "mesh_ontology", "mesh_store.bin")
+
+def build_store(records):
+    """Turn (mesh_id, name, tree numbers) records into the arrays of a store.
+
+    The records can be streamed (see parse_mesh.iter_records), so the XML is
+    never held in memory, but the build itself is not streamed: all of the
+    records are kept, as small tuples, until they are sorted. Peak memory is
+    therefore proportional to the number of records and the length of their
+    names and tree numbers, several times the size of the finished store,
+    rather than to the size of the XML.
+    """
+    records = sorted(records, key = lambda val: val[0])
+
+    ids = [mesh_id for mesh_id, name, tree_nums in records]
+    assert len(set(ids)) == len(ids), "MeSH ids are not unique!"
+
+    names = [name.encode("utf-8") for mesh_id, name, tree_nums in records]
+    name_offsets = np.zeros(len(names) + 1, dtype = np.int64)
+    np.cumsum([len(name) for name in names], out = name_offsets[1 : ])
+
+    listed = [(tree_num, i) for i, (mesh_id, name, tree_nums) in enumerate(records)
+        for tree_num in tree_nums]
+
+    # all tree numbers for each concept are unique
+    trees = np.array([tree_num.encode("ascii") for tree_num, i in listed], dtype = "S")
+    assert len(np.unique(trees)) == len(trees), "MeSH tree numbers are not unique!"
+
+    order = np.argsort(trees, kind = "stable")
+    rank = np.empty(len(order), dtype = np.int32)
+    rank[order] = np.arange(len(order), dtype = np.int32)
+
+    id_tree_offsets = np.zeros(len(records) + 1, dtype = np.int32)
+    np.cumsum([len(tree_nums) for mesh_id, name, tree_nums in records],
+        out = id_tree_offsets[1 : ])
+
+    return {
+        "ids": np.array([mesh_id.encode("ascii") for mesh_id in ids], dtype = "S"),
+        "name_offsets": name_offsets,
+        "names": np.frombuffer(b"".join(names), dtype = np.uint8),
+        "trees": trees[order],
+        "tree_owner": np.array([i for tree_num, i in listed], dtype = np.int32)[order],
+        "id_tree_offsets": id_tree_offsets,
+        "id_trees": rank,
+    }
+
+def padding(pos):
+    return -pos % ALIGN
+
+def write_store(arrays, path = STORE_LOC):
+    """Write the arrays of a store to one file.
+
+    The file is written under a unique temporary name first (see
+    file_util.atomic_path), so that readers never see a partially written
+    store, even with several builds running at once.
+    """
+    header = {"version": STORE_VERSION, "arrays": dict()}
+
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        header["arrays"][name] = [array.dtype.str, array.shape, offset]
+        offset += array.nbytes + padding(array.nbytes)
+
+    header = json.dumps(header).encode("utf-8")
+    start = len(MAGIC) + 8 + len(header)
+    start += padding(start)
+
+    with atomic_path(path) as temp, open(temp, "wb") as fout:
+        fout.write(MAGIC)
+        fout.write(struct.pack("<Q", start))
+        fout.write(header)
+        fout.write(b"\0" * (start - fout.tell()))
+
+        for array in arrays.values():
+            array = np.ascontiguousarray(array)
+            fout.write(array.tobytes())
+            fout.write(b"\0" * padding(array.nbytes))
+
+def read_header(data):
+    """Parse the header at the start of a store. Returns (start of the
+    arrays, dict of name to (dtype, shape, offset)).
+    """
+    assert data[ : len(MAGIC)] == MAGIC, "Not a MeSH store!"
+
+    start, = struct.unpack("<Q", data[len(MAGIC) : len(MAGIC) + 8])
+    header = json.loads(bytes(data[len(MAGIC) + 8 : start]).rstrip(b"\0"))
+
+    assert header["version"] == STORE_VERSION, (
+        "MeSH store was written by a different version of mesh_store!")
+
+    return (start, header["arrays"])
+
+def read_store(path = STORE_LOC):
+    """Memory-map all the arrays of a store.
+
+    The arrays are read-only views of the file, so nothing is read from disk
+    until it is used.
+    """
+    with open(path, "rb") as fin:
+        data = mmap.mmap(fin.fileno(), 0, access = mmap.ACCESS_READ)
+
+    start, layout = read_header(data)
+    res = dict()
+    for name, (dtype, shape, offset) in layout.items():
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        if count == 0:
+            res[name] = np.empty(shape, dtype = dtype)
+        else:
+            res[name] = np.frombuffer(data, dtype = dtype, count = count,
+                offset = start + offset).reshape(shape)
+
+    return res
+
+
+class MeshStore:
+    """Lookups into the arrays of a store."""
+    def __init__(self, arrays):
+        self.arrays = arrays
+
+    def __len__(self):
+        return len(self.arrays["ids"])
+
+    def index(self, mesh_id):
+        """Position of a MeSH id in the store, or -1 if it isn't there."""
+        ids = self.arrays["ids"]
+        key = mesh_id.encode("ascii")
+        i = int(np.searchsorted(ids, key))
+        return i if i < len(ids) and ids[i] == key else -1
+
+    def __contains__(self, mesh_id):
+        return self.index(mesh_id) != -1
+
+    def mesh_id(self, i):
+        return self.arrays["ids"][i].decode("ascii")
+
+    def name(self, i):
+        start, stop = self.arrays["name_offsets"][i : i + 2]
+        return self.arrays["names"][start : stop].tobytes().decode("utf-8")
+
+    def tree_numbers(self, i):
+        start, stop = self.arrays["id_tree_offsets"][i : i + 2]
+        trees = self.arrays["trees"]
+        return [trees[j].decode("ascii") for j in self.arrays["id_trees"][start : stop]]
+
+    def get_name(self, mesh_id, default = None):
+        i = self.index(mesh_id)
+        return default if i == -1 else self.name(i)
+
+    def get_tree_numbers(self, mesh_id):
+        """Tree numbers of a MeSH id, or [] if it has none or isn't in the
+        store.
+        """
+        i = self.index(mesh_id)
+        return [] if i == -1 else self.tree_numbers(i)
+
+    def names(self, supplemental = False):
+        """Dict of MeSH id to name, of either the descriptors or the
+        supplementary concepts.
+        """
+        prefix = "C" if supplemental else "D"
+        return {self.mesh_id(i): self.name(i) for i in range(len(self))
+            if self.arrays["ids"][i][ : 1] == prefix.encode("ascii")}
+
+    def hierarchy(self):
+        """Dict of descriptor id to its list of tree numbers."""
+        return {self.mesh_id(i): self.tree_numbers(i) for i in range(len(self))
+            if self.arrays["ids"][i][ : 1] == b"D"}
+
+
+_store = None
+
+def get_store():
+    """The shared MeshStore, memory-mapped from STORE_LOC on first use.
+
+    Build the store with `python -m src.parse_mesh`.
+    """
+    global _store
+    if _store is None:
+        assert os.path.exists(STORE_LOC), (
+            "No MeSH store at {}, run `python -m src.parse_mesh`".format(STORE_LOC))
+
+        _store = MeshStore(read_store(STORE_LOC))
+
+    return _store
@@ -6,79 +6,133 @@ Last updated: 2015-10-14
 Parses the MeSH XML file into a useable format.
 """
 from collections import defaultdict
+from itertools import chain
 import os
 import pickle
-import xml.etree.cElementTree as ET
+import xml.etree.ElementTree as ET
 
-def parse_mesh_xml(fname):
-    # all tree numbers for each concept are unique
-    tree = ET.parse(fname)
-    root = tree.getroot()
+from .mesh_store import STORE_LOC
+from .mesh_store import build_store
+from .mesh_store import get_store
+from .mesh_store import write_store
 
-    hierarchy = defaultdict(list)
-    concept_name = dict()
-    for record in root:
+def iter_records(fname, tag):
+    """Stream the `tag` elements of a MeSH XML file.
+
+    Each record is cleared, and dropped from the root, as soon as the caller
+    moves on to the next one, so only one record is in memory at a time no
+    matter how large the file is.
+    """
+    context = ET.iterparse(fname, events = ("start", "end"))
+    event, root = next(context)
+
+    for event, elem in context:
+        if event == "end" and elem.tag == tag:
+            yield elem
+
+            elem.clear()
+            root.clear()
+
+def descriptor_records(fname):
+    """(mesh_id, name, tree numbers) of each descriptor of a MeSH XML file."""
+    for record in iter_records(fname, "DescriptorRecord"):
         mesh_id = record.find("DescriptorUI").text
 
         name_root = record.find("DescriptorName")
         assert len(name_root) == 1
         name = name_root.find("String").text
 
+        tree_num_root = record.find("TreeNumberList")
+        if tree_num_root is None:
+            tree_nums = []
+        else:
+            tree_nums = [tree_num.text for tree_num in tree_num_root]
+
+        yield (mesh_id, name, tree_nums)
+
+def supplement_records(fname):
+    """(mesh_id, name, no tree numbers) of each supplementary concept."""
+    for record in iter_records(fname, "SupplementalRecord"):
+        uid = record.find("SupplementalRecordUI").text
+        name = record.find("./SupplementalRecordName/String").text
+
+        yield (uid, name, [])
+
+def parse_mesh_xml(fname):
+    # all tree numbers for each concept are unique
+    hierarchy = defaultdict(list)
+    concept_name = dict()
+    for mesh_id, name, tree_nums in descriptor_records(fname):
         if mesh_id not in concept_name:
             concept_name[mesh_id] = name
         else:
             assert concept_name[mesh_id] == name
 
-        tree_num_root = record.find("TreeNumberList")
-        if tree_num_root is None:
+        if not tree_nums:
             hierarchy[mesh_id] = set()
         else:
-            for tree_num in record.find("TreeNumberList"):
-                hierarchy[mesh_id].append(tree_num.text)
+            hierarchy[mesh_id].extend(tree_nums)
 
     return (concept_name, hierarchy)
 
 def parse_supplement(fname):
     """Determine the official names of the supplemental concepts."""
-    tree = ET.parse(fname)
-    root = tree.getroot()
+    return {uid: name for uid, name, tree_nums in supplement_records(fname)}
 
-    mapping = dict()
-    for record in root.iter("SupplementalRecord"):
-        uid = record.find("SupplementalRecordUI").text
-        name = record.find("./SupplementalRecordName/String").text
+def make_store(mesh_fname, supp_fname, path = STORE_LOC):
+    """Stream both MeSH XML files into one binary store (see mesh_store)."""
+    records = chain(descriptor_records(mesh_fname), supplement_records(supp_fname))
+    write_store(build_store(records), path)
+
+def pickle_records(loc):
+    """(mesh_id, name, tree numbers) records from the pickles written by
+    earlier versions of main().
+    """
+    with open(os.path.join(loc, "mesh_hierarchy.pickle"), "rb") as fin:
+        concept_name, hierarchy = pickle.load(fin)
 
-        mapping[uid] = name
+    for mesh_id, name in concept_name.items():
+        yield (mesh_id, name, list(hierarchy.get(mesh_id, [])))
 
-    return mapping
+    supp_loc = os.path.join(loc, "mesh_supp.pickle")
+    if os.path.exists(supp_loc):
+        with open(supp_loc, "rb") as fin:
+            supplement = pickle.load(fin)
+
+        for uid, name in supplement.items():
+            yield (uid, name, [])
 
 def load_mesh(fname):
+    """Load either the supplementary concept names ("supp") or the
+    descriptor names and hierarchy ("hierarchy").
+
+    Reads the binary store if there is one, and the old pickles otherwise.
+    """
     assert fname in ["supp", "hierarchy"], "Invalid MeSH pickle name"
 
-    cur = os.path.dirname(__file__)
+    if os.path.exists(STORE_LOC):
+        store = get_store()
+        if fname == "supp":
+            return store.names(supplemental = True)
 
-    loc = os.path.join(cur, "..", "data", "mesh_ontology", "mesh_{}.pickle".format(fname))
+        return (store.names(), store.hierarchy())
+
+    # the pickles of an older setup sit where the store would be
+    loc = os.path.join(os.path.dirname(STORE_LOC), "mesh_{}.pickle".format(fname))
     with open(os.path.abspath(loc), "rb") as fin:
         val = pickle.load(fin)
 
     return val
 
 def main():
-    loc = os.path.join("..", "data", "mesh_ontology")
-
-    fname = os.path.abspath(os.path.join(loc, "supp2015.xml"))
-    supplement = parse_supplement(fname)
-
-    with open(os.path.join(loc, "mesh_supp.pickle"), "wb") as fout:
-        pickle.dump(supplement, fout)
-
-#-------------------------------------------------------------------------------
-
-    fname = os.path.abspath(os.path.join(loc, "mesh2015.xml"))
-    concept_name, hierarchy = parse_mesh_xml(fname)
-
-    with open(os.path.join(loc, "mesh_hierarchy.pickle"), "wb") as fout:
-        pickle.dump((concept_name, hierarchy), fout)
+    loc = os.path.dirname(STORE_LOC)
+
+    mesh_fname = os.path.join(loc, "mesh2015.xml")
+    if os.path.exists(mesh_fname):
+        make_store(mesh_fname, os.path.join(loc, "supp2015.xml"))
+    else:
+        # convert the pickles of an older setup
+        write_store(build_store(pickle_records(loc)))
 
 if __name__ == "__main__":
     main()
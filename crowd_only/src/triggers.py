@@ -0,0 +1,142 @@
+"""
+Trigger rules for CID relations.
+
+A chemical-disease annotation pair follows the CID pattern when the
+two annotations are at most max_gap characters apart and the text
+between them contains a trigger, e.g. "cocaine-induced myocardial
+infarction". Forward triggers go between a chemical and a later
+disease, and reverse triggers between a disease and a later chemical
+(e.g. "seizures caused by lidocaine").
+
+Each text is scanned once for every trigger, and the spans found are
+kept in a TriggerIndex. Checking an annotation pair is then a binary
+search instead of lowercasing and searching the text in between.
+"""
+from bisect import bisect_left
+
+# the original CID pattern: "induce" between a chemical and a disease
+DEFAULT_FORWARD = ("induce", )
+MAX_GAP = 15
+
+EXTENDED_FORWARD = ("induce", "-associated", "-related")
+EXTENDED_REVERSE = ("caused by", "induced by")
+
+def find_spans(lowered, patterns):
+    """The (start, stop) of every occurrence of every pattern, sorted."""
+    res = []
+    for pattern in patterns:
+        pos = lowered.find(pattern)
+        while pos != -1:
+            res.append((pos, pos + len(pattern)))
+            pos = lowered.find(pattern, pos + 1)
+
+    return sorted(res)
+
+def suffix_min(values):
+    """res[i] = min(values[i : ])"""
+    res = list(values)
+    for i in range(len(res) - 2, -1, -1):
+        if res[i + 1] < res[i]:
+            res[i] = res[i + 1]
+
+    return res
+
+
+class TriggerRules:
+    """A set of forward and reverse trigger patterns (matched against
+    lowercased text) and the largest allowed gap between annotations.
+    """
+    def __init__(self, forward = DEFAULT_FORWARD, reverse = (), max_gap = MAX_GAP):
+        self.forward = tuple(pattern.lower() for pattern in forward)
+        self.reverse = tuple(pattern.lower() for pattern in reverse)
+        self.max_gap = max_gap
+
+    def key(self):
+        """Everything that the classification of a pair depends upon."""
+        return (self.forward, self.reverse, self.max_gap)
+
+    def __repr__(self):
+        return "<{}>: forward {}, reverse {}, max gap {}".format(
+            self.__class__.__name__, self.forward, self.reverse, self.max_gap)
+
+    def index(self, text):
+        return TriggerIndex(text, self)
+
+    def is_cid(self, triggers, chemical, disease, offset = 0):
+        """Determine if a chemical annotation and a disease annotation follow
+        the CID structure, given the TriggerIndex of the text they are in.
+        offset is the position of that text in the document.
+        """
+        if chemical.stop < disease.start:
+            return (disease.start - chemical.stop <= self.max_gap
+                and triggers.between(chemical.stop - offset, disease.start - offset))
+
+        if self.reverse and disease.stop < chemical.start:
+            return (chemical.start - disease.stop <= self.max_gap
+                and triggers.between(disease.stop - offset,
+                    chemical.start - offset, reverse = True))
+
+        return False
+
+
+class TriggerIndex:
+    """The trigger spans of one text.
+
+    Spans are sorted by start, and min_stops[i] is the earliest end of any
+    span from i on, so there is a trigger inside [start, stop) exactly when
+    the first span starting at or after start has min_stops <= stop.
+
+    The text is only scanned when the first pair close enough to need
+    triggers is checked, since most sentences have no such pair.
+
+    If lowercasing changes the length of the text, then positions in the
+    lowercased text no longer line up, so the text in between is searched
+    directly instead.
+    """
+    __slots__ = ("text", "rules", "exact", "spans")
+
+    def __init__(self, text, rules):
+        self.text = text
+        self.rules = rules
+        self.spans = None
+
+    def scan(self):
+        lowered = self.text.lower()
+        self.exact = len(lowered) == len(self.text)
+
+        self.spans = dict()
+        if self.exact:
+            for reverse, patterns in [(False, self.rules.forward), (True, self.rules.reverse)]:
+                spans = find_spans(lowered, patterns)
+                self.spans[reverse] = ([start for start, stop in spans],
+                    suffix_min(stop for start, stop in spans))
+
+    def between(self, start, stop, reverse = False):
+        """Is there a (forward or reverse) trigger in text[start : stop]?"""
+        if self.spans is None:
+            self.scan()
+
+        if not self.exact:
+            between = self.text[start : stop].lower()
+            patterns = self.rules.reverse if reverse else self.rules.forward
+            return any(pattern in between for pattern in patterns)
+
+        starts, min_stops = self.spans[reverse]
+        i = bisect_left(starts, start)
+        return i < len(starts) and min_stops[i] <= stop
+
+
+_rules = TriggerRules()
+
+def get_rules():
+    """Returns the trigger rules used for all CID classification."""
+    return _rules
+
+def set_rules(rules):
+    """Replace the shared trigger rules, e.g. set_rules(TriggerRules(
+    EXTENDED_FORWARD, EXTENDED_REVERSE)).
+
+    Papers which were already made keep their relations.
+    """
+    global _rules
+    _rules = rules
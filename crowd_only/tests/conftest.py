@@ -0,0 +1,43 @@
+import os
+import stat
+import sys
+
+import pytest
+
+# the package is imported as `src` from the crowd_only directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, FIXTURES)
+
+from src.lingpipe import split_sentences
+from src.lingpipe.split_sentences import SentenceSplitter
+
+@pytest.fixture(autouse = True)
+def private_split_cache(tmp_path, monkeypatch):
+    """Never let a test open the user's split cache: a cache opened by
+    default lives in the test's own directory.
+    """
+    monkeypatch.setenv(split_sentences.CACHE_ENV, str(tmp_path / "split_cache.sqlite"))
+    monkeypatch.setattr(split_sentences, "_cache", None)
+
+@pytest.fixture
+def stub_java(tmp_path):
+    """An executable which runs the stub splitter, used in place of java."""
+    path = tmp_path / "java"
+    path.write_text("#!/bin/sh\nexec {} {} \"$@\"\n".format(sys.executable,
+        os.path.join(FIXTURES, "stub_splitter.py")))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+@pytest.fixture
+def splitter(stub_java):
+    with SentenceSplitter(java = stub_java) as splitter:
+        yield splitter
+
+@pytest.fixture
+def shared_splitter(splitter, monkeypatch):
+    """Make the stub the shared splitter, with the split cache turned off."""
+    monkeypatch.setattr(split_sentences, "_splitter", splitter)
+    monkeypatch.setattr(split_sentences, "_cache", False)
+    return splitter
@@ -0,0 +1,34 @@
+"""
+Stand-in for `java SplitAbstract -server`, speaking the same framed protocol:
+a line with the number of UTF-8 bytes of an abstract, then the abstract, and
+in return a line with the number of sentences and one "start stop" line each.
+"""
+import re
+import sys
+
+SENTENCE = re.compile(r"\S.*?(?:[.!?](?=\s+[A-Z(])|$)", re.S)
+
+def sentence_spans(text):
+    return [(match.start(), match.end()) for match in SENTENCE.finditer(text)]
+
+def main():
+    assert sys.argv[1 : ] == ["SplitAbstract", "-server"], sys.argv
+
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        header = stdin.readline()
+        if not header:
+            break
+
+        text = stdin.read(int(header)).decode("utf-8")
+
+        spans = sentence_spans(text)
+        stdout.write("{}\n".format(len(spans)).encode("ascii"))
+        for start, stop in spans:
+            stdout.write("{} {}\n".format(start, stop).encode("ascii"))
+
+        stdout.flush()
+
+if __name__ == "__main__":
+    main()
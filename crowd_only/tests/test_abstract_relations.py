@@ -0,0 +1,66 @@
+from itertools import product
+import os
+
+from src.data_model import AbstractRelations
+from src.data_model import OntologyID
+from src.data_model import parse_input
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def old_abs_relations(paper):
+    """The abstract-level relations as Paper.classify_relations used to make
+    them: the whole Cartesian product minus the sentence-bound pairs.
+    """
+    all_rels = set(product(paper.concepts["chemical"], paper.concepts["disease"]))
+    return all_rels - paper.poss_relations["CID"] - paper.poss_relations["sent"]
+
+def ids(*values):
+    return [OntologyID(value) for value in values]
+
+def test_same_as_cartesian_product(shared_splitter):
+    papers = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False)
+
+    for paper in papers.values():
+        abs_rels = paper.poss_relations["abs"]
+        expected = old_abs_relations(paper)
+
+        assert isinstance(abs_rels, AbstractRelations)
+        assert abs_rels == expected
+        assert len(abs_rels) == len(expected) == len(list(abs_rels))
+
+        # the three groups still cover every possible pair exactly once
+        total = sum(len(rels) for rels in paper.poss_relations.values())
+        assert total == len(paper.concepts["chemical"]) * len(paper.concepts["disease"])
+
+        for rel in paper.gold_relations:
+            assert rel.origin in paper.poss_relations
+
+    # "Renal failure was not seen." has no chemical in its sentence
+    renal = papers[2491759].poss_relations["abs"]
+    assert tuple(ids("D007213", "D051437")) in renal
+
+def test_set_operations():
+    chems = ids("D000001", "D000002", "D000003")
+    dises = ids("D000004", "D000005")
+    bound = {(chems[0], dises[0]), (chems[2], dises[1])}
+
+    rels = AbstractRelations(chems, dises, bound)
+    expected = set(product(chems, dises)) - bound
+
+    assert len(rels) == 4
+    assert set(rels) == expected
+    assert (chems[0], dises[1]) in rels
+    assert (chems[0], dises[0]) not in rels
+    assert (dises[0], chems[0]) not in rels
+    assert "not a pair" not in rels and None not in rels
+
+    # set operations give back regular sets
+    other = {(chems[0], dises[1]), (chems[0], dises[0])}
+    assert rels & other == {(chems[0], dises[1])}
+    assert isinstance(rels & other, set)
+    assert rels | other == expected | other
+    assert rels - other == expected - other
+    assert rels.isdisjoint(bound)
+
+    assert len(AbstractRelations([], dises, [])) == 0
+    assert list(AbstractRelations(chems, [], [])) == []
@@ -0,0 +1,124 @@
+import random
+
+from src.data_model import Annotation
+from src.data_model import Paper
+
+def old_resolve_acronyms(paper):
+    """The resolver before annotations were indexed by text: every later
+    annotation is scanned for each definition. The two bugs it had (a
+    missing update_uid, and a generator tested for truthiness) are fixed so
+    that it resolves anything at all.
+    """
+    annotations = paper.annotations
+    used = [False] * len(annotations)
+    full_text = paper.text
+
+    for i, definition in enumerate(annotations[ : -1]):
+        if not used[i] and definition.uid.has_mesh():
+            acronym = annotations[i + 1]
+
+            if (acronym.stype == definition.stype
+                and acronym.start == definition.stop + 2
+                and acronym.stop < len(full_text)
+                and full_text[acronym.start - 1] == "("
+                and full_text[acronym.stop] == ")"):
+
+                used[i] = True
+                for j in range(i + 1, len(annotations)):
+                    annot = annotations[j]
+                    if (annot.stype == definition.stype
+                        and not used[j]
+                        and not annot.uid.has_mesh()
+                        and annot.text == acronym.text):
+
+                        annot.uid.update_ids(definition.uid)
+                        used[j] = True
+
+def make_paper(title, pieces, fix_acronyms):
+    """A Paper whose abstract is the text of all the pieces. Each piece is
+    either plain text or a (text, stype, uid) mention, which is annotated.
+    The whole abstract is one sentence.
+    """
+    text = title + " "
+    annotations = []
+    for piece in pieces:
+        if isinstance(piece, tuple):
+            mention, stype, uid = piece
+            annotations.append(Annotation(uid, stype, mention, len(text),
+                len(text) + len(mention)))
+            piece = mention
+
+        text += piece
+
+    abstract = text[len(title) + 1 : ]
+    return Paper(1, title, abstract, annotations, fix_acronyms = fix_acronyms,
+        abstract_sentences = [abstract])
+
+def resolved_ids(title, pieces):
+    new = make_paper(title, pieces, True)
+
+    old = make_paper(title, pieces, False)
+    old_resolve_acronyms(old)
+
+    assert [a.uid.flat_repr for a in new.annotations] == [a.uid.flat_repr for a in old.annotations]
+    return [(a.text, a.uid.flat_repr) for a in new.annotations]
+
+def chem(text, uid = "-1"):
+    return (text, "Chemical", uid)
+
+def dise(text, uid = "-1"):
+    return (text, "Disease", uid)
+
+def test_resolves_later_mentions():
+    ids = resolved_ids("Nephrotoxicity.", [
+        "Early ", chem("CsA"), " doses. ",
+        chem("Cyclosporine A", "D016572"), " (", chem("CsA"), ") and ",
+        chem("5-fluorouracil", "D005472"), " (", chem("5-FU"), ") caused ",
+        dise("renal failure", "D051437"), " (", dise("RF"), "). ",
+        chem("CsA"), " with ", chem("5-FU"), " again; ", dise("CsA"), " and ",
+        dise("RF"), " resolved.",
+    ])
+
+    assert ids == [
+        ("CsA", "unknown:-1"), # before the definition
+        ("Cyclosporine A", "MESH:D016572"),
+        ("CsA", "MESH:D016572"),
+        ("5-fluorouracil", "MESH:D005472"),
+        ("5-FU", "MESH:D005472"),
+        ("renal failure", "MESH:D051437"),
+        ("RF", "MESH:D051437"),
+        ("CsA", "MESH:D016572"),
+        ("5-FU", "MESH:D005472"),
+        ("CsA", "unknown:-1"), # a disease, unlike the definition
+        ("RF", "MESH:D051437"),
+    ]
+
+def test_needs_parentheses_right_after_definition():
+    ids = resolved_ids("Title.", [
+        chem("Cyclosporine A", "D016572"), " [", chem("CsA"), "] then ",
+        chem("Lithium", "D008094"), "  (", chem("Li"), ") then ",
+        chem("CsA"), " and ", chem("Li"), ".",
+    ])
+
+    assert all(uid == "unknown:-1" for text, uid in ids if text in ("CsA", "Li"))
+
+def test_same_as_old_resolver_on_random_papers():
+    rng = random.Random(0)
+    acronyms = ["AB", "CD", "EF", "GH"]
+    names = ["alpha", "beta", "gamma"]
+
+    for trial in range(200):
+        pieces = []
+        for i in range(rng.randint(1, 60)):
+            maker = rng.choice([chem, dise])
+            if rng.random() < 0.3:
+                uid = rng.choice(["D00000{}".format(k) for k in range(1, 6)])
+                pieces += [maker(rng.choice(names), uid), " (",
+                    maker(rng.choice(acronyms)), ")"]
+            else:
+                pieces.append(maker(rng.choice(acronyms),
+                    rng.choice(["-1", "-1", "D000009", "CHEBI:1"])))
+
+            pieces.append(rng.choice([" and ", ". ", " with "]))
+
+        resolved_ids("Random title.", pieces)
@@ -0,0 +1,89 @@
+import os
+
+from src.befree import Unsplit
+from src.befree import match_sentences
+from src.befree import read_sentence_files
+from src.data_model import parse_input
+from src.lingpipe import split_sentences
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+TITLE = "Indomethacin-induced hyperkalemia."
+ABSTRACT = ("METHODS: A patient was treated with indomethacin. Potassium rose. "
+    "RESULTS: Hyperkalemia developed. It resolved. Renal failure was not seen. "
+    "CONCLUSIONS: Stop the drug.")
+
+def test_match_sentences():
+    known = {
+        0: TITLE,
+        1: "A patient was treated with indomethacin.",
+        3: "Hyperkalemia developed.",
+        6: "Stop the drug.",
+    }
+
+    assert match_sentences(TITLE, ABSTRACT, known) == [
+        "METHODS: A patient was treated with indomethacin.",
+        "Potassium rose.", # the one sentence between 1 and 3
+        "RESULTS: Hyperkalemia developed.",
+        Unsplit("It resolved. Renal failure was not seen."),
+        "CONCLUSIONS: Stop the drug.",
+    ]
+
+    # everything after the last listed sentence is left to the splitter
+    assert match_sentences(TITLE, ABSTRACT, {1: known[1]}) == [known[1].join(
+        ["METHODS: ", ""]), Unsplit(ABSTRACT[ABSTRACT.index("Potassium") : ])]
+
+def test_mismatches():
+    assert match_sentences(TITLE, ABSTRACT, {0: "Another title."}) is None
+    assert match_sentences(TITLE, ABSTRACT, {1: "Not in the abstract."}) is None
+
+    # sentences 1 and 2 must be next to each other
+    assert match_sentences(TITLE, ABSTRACT, {1: "A patient was treated with indomethacin.",
+        2: "Hyperkalemia developed."}) is None
+
+    # sentences must end at a space
+    assert match_sentences(TITLE, ABSTRACT, {1: "A patient was treat"}) is None
+
+def write_sentence_file(path, rows):
+    with open(path, "w") as fout:
+        fout.write("pmid\tnum_sent\tmention_start\tmention_stop\tmention_text\t"
+            "mention_type\tmention_id\tsentence_text\n")
+
+        for pmid, num, text in rows:
+            fout.write("{}\t{}\t0\t1\tx\tChemical\t-1\t{}\n".format(pmid, num, text))
+
+def sentences(papers):
+    return {pmid: [s.text for s in paper.sentences] for pmid, paper in papers.items()}
+
+def test_same_sentences_as_lingpipe(shared_splitter, tmp_path, monkeypatch):
+    split = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False)
+
+    path = str(tmp_path / "sentences.txt")
+    write_sentence_file(path, [
+        (439781, 0, "Famotidine-associated delirium."),
+        (439781, 1, "Famotidine is a histamine H2-receptor antagonist."),
+        (439781, 3, "Delirium cleared after famotidine was stopped."),
+        (439781, 3, "Delirium cleared after famotidine was stopped."),
+        (2491759, 1, "Hyperkalemia developed in a patient treated with indomethacin."),
+    ])
+
+    known = read_sentence_files([path])
+    assert sorted(known[439781]) == [0, 1, 3]
+
+    # only the end of the indomethacin abstract still needs the splitter
+    abstracts = []
+    split_abstracts = split_sentences.split_abstracts
+    def recording(texts):
+        texts = list(texts)
+        abstracts.extend(texts)
+        return split_abstracts(texts)
+
+    monkeypatch.setattr("src.befree.split_abstracts", recording)
+
+    befree = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False,
+        sentence_files = [path])
+
+    assert abstracts == ["Renal failure was not seen."]
+    assert sentences(befree) == sentences(split)
+    assert ({pmid: paper.poss_relations for pmid, paper in befree.items()}
+        == {pmid: paper.poss_relations for pmid, paper in split.items()})
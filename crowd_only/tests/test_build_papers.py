@@ -0,0 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import multiprocessing
+import os
+
+import pytest
+
+from src import data_model
+from src.data_model import corpus_cache_key
+from src.data_model import parse_file
+from src.data_model import parse_input
+from src.triggers import EXTENDED_FORWARD
+from src.triggers import EXTENDED_REVERSE
+from src.triggers import TriggerRules
+from src.triggers import get_rules
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+EXTENDED = TriggerRules(EXTENDED_FORWARD, EXTENDED_REVERSE)
+
+def cid_pairs(papers):
+    return {pmid: sorted((chem.uid, dise.uid) for chem, dise in paper.poss_relations["CID"])
+        for pmid, paper in papers.items()}
+
+@pytest.fixture(params = ["spawn", "forkserver"])
+def pool_context(request, monkeypatch):
+    """Build Papers in workers which don't inherit this process's state."""
+    monkeypatch.setattr(data_model, "ProcessPoolExecutor", partial(ProcessPoolExecutor,
+        mp_context = multiprocessing.get_context(request.param)))
+
+def test_workers_use_the_given_rules(shared_splitter, pool_context):
+    assert get_rules().key() != EXTENDED.key()
+
+    serial = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False,
+        rules = EXTENDED)
+    pooled = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False,
+        workers = 2, rules = EXTENDED)
+
+    # "Famotidine-associated delirium" is only CID with the extended rules
+    assert cid_pairs(serial)[439781] == [("D015738", "D003693")]
+    assert cid_pairs(pooled) == cid_pairs(serial)
+
+    default = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False,
+        workers = 2)
+    assert cid_pairs(default)[439781] == []
+
+def test_cache_key_matches_the_rules_used(shared_splitter, tmp_path):
+    save_loc = str(tmp_path / "corpus.pickle")
+    papers = parse_file(save_loc, loc = FIXTURES, fname = "sample.PubTator",
+        fix_acronyms = False, rules = EXTENDED)
+
+    assert cid_pairs(papers)[439781] == [("D015738", "D003693")]
+    assert (corpus_cache_key(FIXTURES, "sample.PubTator", False, rules = EXTENDED)
+        != corpus_cache_key(FIXTURES, "sample.PubTator", False))
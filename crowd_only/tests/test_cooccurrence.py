@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from src.cooccurrence import build_corpus_arrays
+from src.cooccurrence import classify_corpus
+from src.cooccurrence import classify_papers
+from src.cooccurrence import paper_documents
+from src.data_model import parse_input
+from src.mesh_ids import decode_relations
+from src.triggers import EXTENDED_FORWARD
+from src.triggers import EXTENDED_REVERSE
+from src.triggers import TriggerRules
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+EXTENDED = TriggerRules(EXTENDED_FORWARD, EXTENDED_REVERSE)
+
+@pytest.mark.parametrize("rules", [None, EXTENDED], ids = ["default", "extended"])
+@pytest.mark.parametrize("fix_acronyms", [False, True])
+def test_same_as_papers(shared_splitter, rules, fix_acronyms):
+    papers = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = fix_acronyms,
+        rules = rules)
+
+    res = classify_papers(papers.values(), rules)
+
+    assert sorted(res) == sorted(papers)
+    for pmid, paper in papers.items():
+        assert res[pmid] == paper.poss_relations
+
+def test_rules_change_the_tables(shared_splitter):
+    papers = parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False)
+
+    def tables(rules):
+        arrays = build_corpus_arrays(paper_documents(papers.values()), rules)
+        return {origin: decode_relations(rels)
+            for origin, rels in classify_corpus(arrays).items()}
+
+    default = tables(None)
+    extended = tables(EXTENDED)
+
+    famotidine = (439781, "MESH:D015738", "MESH:D003693")
+    assert famotidine in default["sent"]
+    assert famotidine in extended["CID"]
+
+    indomethacin = (2491759, "MESH:D007213", "MESH:D006947")
+    assert indomethacin in default["CID"] and indomethacin in extended["CID"]
+
+    # the three groups are the same pairs, just sorted differently
+    for rels in [default, extended]:
+        assert not rels["CID"] & rels["sent"] and not rels["abs"] & (rels["CID"] | rels["sent"])
+
+    assert (default["CID"] | default["sent"] | default["abs"]
+        == extended["CID"] | extended["sent"] | extended["abs"])
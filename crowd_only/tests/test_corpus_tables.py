@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+from src import corpus_tables
+from src.corpus_tables import TABLE_NAMES
+from src.corpus_tables import load_corpus_tables
+from src.corpus_tables import relation_array
+from src.corpus_tables import save_corpus_tables
+from src.data_model import parse_input
+from src.eval_perf import get_gold_rels
+from src.mesh_ids import decode_relations
+from src.mesh_ids import encode_relations
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+@pytest.fixture
+def papers(shared_splitter):
+    return parse_input(FIXTURES, "sample.PubTator", fix_acronyms = False)
+
+def poss_triples(papers, origin):
+    return {(pmid, chem.flat_repr, dise.flat_repr)
+        for pmid, paper in papers.items()
+            for chem, dise in paper.poss_relations[origin]}
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_round_trip(papers, tmp_path, fmt):
+    location = str(tmp_path / "tables")
+    save_corpus_tables(papers, location, fmt)
+
+    # no temporary files are left behind
+    assert sorted(os.listdir(location)) == sorted(name + corpus_tables.FORMATS[fmt]
+        for name in TABLE_NAMES)
+
+    tables = load_corpus_tables(location)
+
+    gold = relation_array(tables["gold_relations"])
+    assert np.array_equal(np.sort(gold), encode_relations(get_gold_rels(papers)))
+    assert decode_relations(gold) == get_gold_rels(papers)
+
+    relations = tables["relations"]
+    for origin in ["CID", "sent", "abs"]:
+        assert decode_relations(relation_array(relations, origin)) == poss_triples(papers, origin)
+
+    # the string id columns match the integer codes
+    frame = relations.to_pandas()
+    assert set(zip(frame["pmid"], frame["chemical_id"].astype(str),
+        frame["disease_id"].astype(str))) == decode_relations(relation_array(relations))
+
+    paper_frame = tables["papers"].to_pandas()
+    assert sorted(paper_frame["pmid"]) == sorted(papers)
+    for pmid, title, abstract in zip(paper_frame["pmid"], paper_frame["title"],
+        paper_frame["abstract"]):
+        assert (title, abstract) == (papers[pmid].title, papers[pmid].abstract)
+
+    sentences = tables["sentences"].to_pandas()
+    assert len(sentences) == sum(len(paper.sentences) for paper in papers.values())
+
+    annotations = tables["annotations"].to_pandas()
+    assert sorted(zip(annotations["pmid"], annotations["start"], annotations["uid"])) == sorted(
+        (pmid, annot.start, annot.uid.flat_repr)
+            for pmid, paper in papers.items() for annot in paper.annotations)
+
+def test_other_versions_are_rejected(papers, tmp_path, monkeypatch):
+    location = str(tmp_path / "tables")
+    save_corpus_tables(papers, location)
+
+    monkeypatch.setattr(corpus_tables, "TABLES_VERSION", corpus_tables.TABLES_VERSION + 1)
+    with pytest.raises(AssertionError):
+        load_corpus_tables(location)
@@ -0,0 +1,116 @@
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+import os
+import threading
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+import xml.etree.ElementTree as ET
+
+import pandas as pd
+import pytest
+
+from src import eutils
+from src.get_mesh_terms import Article
+from src.get_mesh_terms import get_articles
+from src.get_pubmed_abstract import get_abstract_information
+from src.get_pubmed_abstract import get_abstracts
+
+SYNTHETIC = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    "fixtures", "synthetic_pubmed_articles.xml")
+
+# made up PMIDs, far above any real one
+SYNTHETIC_PMIDS = [990000001, 990000002, 990000003]
+
+def synthetic_articles():
+    """The synthetic PubmedArticle elements as XML strings, keyed by PMID."""
+    root = ET.parse(SYNTHETIC).getroot()
+    return {article.find("./MedlineCitation/PMID").text:
+        ET.tostring(article, encoding = "unicode")
+        for article in root.iter("PubmedArticle")}
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers efetch like NCBI, with only the synthetic articles."""
+    def answer(self, params):
+        self.server.requests.append((self.command, params["id"][0].split(",")))
+
+        body = "<?xml version=\"1.0\" ?>\n<PubmedArticleSet>\n{}</PubmedArticleSet>\n".format(
+            "".join(self.server.articles[pmid] for pmid in params["id"][0].split(",")
+                if pmid in self.server.articles))
+
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.answer(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        self.answer(parse_qs(self.rfile.read(length).decode("utf-8")))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(("127.0.0.1", 0), StandIn)
+    httpd.articles = synthetic_articles()
+    httpd.requests = []
+
+    thread = threading.Thread(target = httpd.serve_forever, daemon = True)
+    thread.start()
+
+    old_base = eutils.get_base_url()
+    eutils.set_base_url("http://127.0.0.1:{}/entrez/eutils".format(httpd.server_port))
+    yield httpd
+
+    eutils.set_base_url(old_base)
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_posts_batches_of_200(server):
+    # most of these are not in the synthetic response
+    pmids = list(range(1, 448)) + SYNTHETIC_PMIDS
+    abstracts = get_abstracts(pmids)
+
+    assert [(method, len(ids)) for method, ids in server.requests] == [
+        ("POST", 200), ("POST", 200), ("POST", 50)]
+    assert sum((ids for method, ids in server.requests), []) == [str(pmid) for pmid in pmids]
+
+    # PMIDs missing from the response are skipped
+    assert sorted(abstracts) == sorted(SYNTHETIC_PMIDS)
+
+def test_abstracts_match_single_fetches(server):
+    abstracts = get_abstracts(SYNTHETIC_PMIDS + [1])
+
+    assert abstracts[990000001] == ("Synthetic article one: famotidine and delirium.", [
+        "BACKGROUND: A labelled background section.",
+        "RESULTS: A labelled results section."])
+    assert abstracts[990000003] == ("Synthetic article three, without an abstract.", [])
+
+    for pmid in SYNTHETIC_PMIDS:
+        assert abstracts[pmid] == get_abstract_information(str(pmid))
+
+def test_articles_match_single_fetches(server):
+    articles = get_articles(SYNTHETIC_PMIDS + [1], batch_size = 2)
+    assert [method for method, ids in server.requests] == ["POST", "POST"]
+    assert sorted(articles) == sorted(SYNTHETIC_PMIDS)
+
+    for pmid in SYNTHETIC_PMIDS:
+        single = Article(pmid)
+        batched = articles[pmid]
+
+        assert batched.pmid == single.pmid == pmid
+        assert batched.title == single.title
+        assert batched.abstract == single.abstract
+        assert batched.chemical_terms == single.chemical_terms
+        pd.testing.assert_frame_equal(batched.mesh_terms, single.mesh_terms)
+        pd.testing.assert_frame_equal(batched.pub_type, single.pub_type)
+
+    assert articles[990000001].chemical_terms == ["D015738"]
+    assert len(articles[990000001].mesh_terms) == 2
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from src.eval_perf import get_relation_array
+from src.eval_perf import official_F_score
+from src.eval_perf import performance
+from src.mesh_hierarchy import MeshHierarchy
+from src.mesh_ids import encode_relations
+
+GOLD = {
+    (1, "MESH:D003042", "MESH:D003693"),
+    (2, "MESH:D008012", "MESH:D007674"),
+}
+
+def prediction_frame(rows):
+    return pd.DataFrame(rows, columns = ["pmid", "chemical_id", "disease_id"])
+
+def test_non_mesh_ids_are_false_positives():
+    predict = prediction_frame([
+        (1, "MESH:D003042", "MESH:D003693"),
+        (1, "CHEBI:27732", "MESH:D003693"),
+        (1, "CHEBI:16236", "MESH:D003693"),
+        (2, "MESH:D008012", "MESH:D007674"),
+    ])
+
+    rels = np.unique(get_relation_array(predict))
+    assert len(rels) == 4
+    assert (rels["chem"] < 0).sum() == 2
+
+    precision, recall, f1 = performance(encode_relations(GOLD), rels)
+    assert recall == 1
+    assert precision == 0.5
+
+def test_non_mesh_ids_match_triple_sets():
+    rows = [
+        (1, "MESH:D003042", "MESH:D003693"),
+        (1, "CHEBI:27732", "MESH:D003693"),
+        (3, "MESH:D008012", "CHEBI:27732"),
+    ]
+
+    from_arrays = performance(encode_relations(GOLD),
+        np.unique(get_relation_array(prediction_frame(rows))))
+
+    from_sets = performance(GOLD, set(rows))
+    assert from_arrays == from_sets
+
+def test_official_F_score_with_mesh_filter():
+    hierarchy = MeshHierarchy.from_hierarchy({
+        "D007674": ["C12.777.419"], # kidney diseases
+        "D051437": ["C12.777.419.780"], # renal insufficiency
+        "D007676": ["C12.777.419.780.050"], # kidney failure, chronic
+        "D003693": ["F03.087.300"], # delirium
+    })
+
+    predict = pd.DataFrame([
+        (1, "MESH:D003042", "MESH:D007674", 0.9),
+        (1, "MESH:D003042", "MESH:D007676", 0.5),
+        (1, "MESH:D003042", "MESH:D003693", 0.5),
+        (2, "MESH:D003042", "MESH:D007674", 0.5),
+    ], columns = ["pmid", "chemical_id", "disease_id", "score"])
+
+    gold = {
+        (1, "MESH:D003042", "MESH:D007674"),
+        (1, "MESH:D003042", "MESH:D007676"),
+        (2, "MESH:D003042", "MESH:D007674"),
+    }
+
+    plain = official_F_score("score", gold, predict, hierarchy = hierarchy)
+    filtered = official_F_score("score", gold, predict, apply_mesh_filter = True,
+        hierarchy = hierarchy)
+
+    assert plain["threshold"].tolist() == [0.5, 0.9]
+    assert filtered["threshold"].tolist() == [0.5, 0.9]
+
+    # at 0.5 kidney diseases is dropped for PMID 1 only, since kidney failure
+    # is also predicted there
+    assert plain["precision"].tolist() == [0.75, 1]
+    assert plain["recall"].tolist() == [1, 1 / 3]
+    assert filtered["precision"].tolist() == [2 / 3, 1]
+    assert filtered["recall"].tolist() == [2 / 3, 1 / 3]
@@ -0,0 +1,81 @@
+import os
+import shutil
+
+import pytest
+
+from src import data_model
+from src.data_model import parse_file
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+NEW_RECORD = """100|t|Lidocaine-induced seizures.
+100|a|Seizures were seen after lidocaine.
+100	0	9	Lidocaine	Chemical	D008012
+100	18	26	seizures	Disease	D012640
+100	28	36	Seizures	Disease	D012640
+100	53	62	lidocaine	Chemical	D008012
+100	CID	D008012	D012640
+
+"""
+
+def summary(papers):
+    return {pmid: (paper.text, [(a.text, a.uid.flat_repr) for a in paper.annotations],
+        [(s.start, s.stop) for s in paper.sentences],
+        {origin: sorted((chem.flat_repr, dise.flat_repr) for chem, dise in rels)
+            for origin, rels in paper.poss_relations.items()},
+        sorted((rel.chem.flat_repr, rel.dise.flat_repr, rel.origin)
+            for rel in paper.gold_relations))
+        for pmid, paper in papers.items()}
+
+@pytest.fixture
+def corpus(tmp_path):
+    shutil.copy(os.path.join(FIXTURES, "sample.PubTator"), str(tmp_path))
+    return {"loc": str(tmp_path), "fname": "sample.PubTator", "fix_acronyms": False}
+
+@pytest.fixture
+def built(monkeypatch):
+    """The PMIDs of every Paper made."""
+    res = []
+    make_paper = data_model.make_paper
+
+    def counting(args):
+        res.append(args[0][0])
+        return make_paper(args)
+
+    monkeypatch.setattr(data_model, "make_paper", counting)
+    return res
+
+def test_only_changed_records_are_parsed(corpus, tmp_path, shared_splitter, built, capsys):
+    save_loc = str(tmp_path / "corpus.pickle")
+    parse_file(save_loc, **corpus)
+    assert sorted(built) == [439781, 2491759]
+
+    # change one annotation's id, drop one record and add another
+    path = os.path.join(corpus["loc"], corpus["fname"])
+    with open(path) as fin:
+        text = fin.read()
+
+    famotidine, indomethacin = text.strip().split("\n\n")
+    famotidine = famotidine.replace("117\t125\tdelirium\tDisease\tD003693",
+        "117\t125\tdelirium\tDisease\tD003693|D000001")
+
+    with open(path, "w") as fout:
+        fout.write(NEW_RECORD + famotidine + "\n\n")
+
+    del built[:]
+    capsys.readouterr()
+
+    updated = parse_file(save_loc, **corpus)
+    assert ("Corpus cache update: {} (1 added, 1 changed, 1 removed)".format(save_loc)
+        in capsys.readouterr().out)
+    assert sorted(built) == [100, 439781]
+
+    # the same corpus as parsing everything again
+    full = parse_file(str(tmp_path / "full.pickle"), incremental = False, **corpus)
+    assert sorted(updated) == [100, 439781]
+    assert summary(updated) == summary(full)
+
+    # and the updated cache is used as is from now on
+    del built[:]
+    assert summary(parse_file(save_loc, **corpus)) == summary(full)
+    assert built == []
@@ -0,0 +1,126 @@
+import random
+
+import numpy as np
+import pytest
+
+from src import mesh_store
+from src.data_model import OntologyID
+from src.data_model import Relation
+from src.mesh_filter import filter_relations
+from src.mesh_filter import mesh_filter
+from src.mesh_filter import removal_scores
+from src.mesh_hierarchy import MeshHierarchy
+from src.mesh_ids import decode_mesh_ids
+from src.mesh_ids import encode_relations
+from src.mesh_store import MeshStore
+from src.mesh_store import build_store
+
+def random_hierarchy(rng, num_concepts = 40):
+    """Dict of MeSH id to tree numbers, with some concepts on two branches."""
+    trees = ["C01", "C12", "F03"]
+    for i in range(num_concepts * 2):
+        parent = rng.choice(trees)
+        trees.append("{}.{:03d}".format(parent, rng.randint(0, 999)))
+
+    trees = sorted(set(trees))
+    rng.shuffle(trees)
+
+    res = dict()
+    for i in range(num_concepts):
+        res["D{:06d}".format(i + 1)] = [trees.pop()]
+
+    while trees:
+        res[rng.choice(sorted(res))].append(trees.pop())
+
+    return res
+
+@pytest.fixture
+def hierarchy(monkeypatch):
+    """A random hierarchy, used as the shared MeSH store."""
+    res = random_hierarchy(random.Random(0))
+
+    records = [(mesh_id, "", tree_nums) for mesh_id, tree_nums in res.items()]
+    monkeypatch.setattr(mesh_store, "_store", MeshStore(build_store(records)))
+    return res
+
+def old_mesh_filter(concepts, hierarchy):
+    """mesh_filter before tree number prefixes were indexed: each tree number
+    is checked against every tree number seen so far.
+    """
+    def redundant(tree_num):
+        return any(label.startswith(tree_num) for label in seen)
+
+    tree_nums = sorted(((tree_num, concept) for concept in concepts
+        for tree_num in hierarchy[concept]), key = lambda val: len(val[0]),
+        reverse = True)
+
+    seen = set()
+    ans = set()
+    for tree_num, concept in tree_nums:
+        if concept in ans:
+            seen.add(tree_num)
+        elif not redundant(tree_num):
+            ans.add(concept)
+            seen.add(tree_num)
+
+    return ans
+
+def test_same_as_old_filter(hierarchy):
+    rng = random.Random(1)
+    for trial in range(300):
+        concepts = rng.sample(sorted(hierarchy), rng.randint(1, 12))
+        assert mesh_filter(concepts) == old_mesh_filter(concepts, hierarchy)
+
+def test_concepts_without_trees_are_kept(hierarchy):
+    concepts = ["D000001", "C000001", "D999999"]
+    assert mesh_filter(concepts) == {"C000001", "D999999"} | old_mesh_filter(
+        ["D000001"], hierarchy)
+
+def random_relations(rng, hierarchy, num_rels):
+    diseases = sorted(hierarchy) + ["C000001"]
+    return [Relation(rng.randint(1, 3), OntologyID(rng.choice(["D100001", "D100002"])),
+        OntologyID(rng.choice(diseases)), "CID") for i in range(num_rels)]
+
+def test_filter_relations(hierarchy):
+    rng = random.Random(2)
+    for trial in range(100):
+        relations = random_relations(rng, hierarchy, rng.randint(1, 30))
+
+        kept = set()
+        for pmid, chem in {(rel.pmid, rel.chem) for rel in relations}:
+            diseases = {rel.dise.uid for rel in relations
+                if (rel.pmid, rel.chem) == (pmid, chem)}
+
+            treed = {dise for dise in diseases if dise in hierarchy}
+            kept |= {(pmid, chem, dise)
+                for dise in old_mesh_filter(treed, hierarchy) | (diseases - treed)}
+
+        # relations come back in their original order, duplicates and all
+        assert filter_relations(relations) == [rel for rel in relations
+            if (rel.pmid, rel.chem, rel.dise.uid) in kept]
+
+def test_removal_scores_match_filter_at_each_threshold(hierarchy):
+    shared = MeshHierarchy(mesh_store.get_store())
+
+    rng = random.Random(3)
+    for trial in range(100):
+        relations = random_relations(rng, hierarchy, rng.randint(1, 30))
+
+        triples = {(rel.pmid, rel.chem.flat_repr, rel.dise.flat_repr): rel
+            for rel in relations}
+        scores = {triple: rng.choice([0.1, 0.5, 0.5, 0.9]) for triple in triples}
+
+        # the triple of each row of the relation array
+        rels = encode_relations(triples)
+        order = list(zip(rels["pmid"].tolist(), decode_mesh_ids(rels["chem"]),
+            decode_mesh_ids(rels["dise"])))
+        score = np.array([scores[triple] for triple in order])
+
+        removed_at = removal_scores(rels, score, shared)
+        for threshold in set(scores.values()):
+            chosen = [triples[triple] for triple in order if scores[triple] >= threshold]
+            expected = {(rel.pmid, rel.chem.flat_repr, rel.dise.flat_repr)
+                for rel in filter_relations(chosen)}
+
+            kept = (score >= threshold) & ~(removed_at >= threshold)
+            assert {triple for triple, keep in zip(order, kept) if keep} == expected
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from src.mesh_hierarchy import MeshHierarchy
+from src.mesh_ids import encode_mesh_id
+from src.mesh_ids import encode_mesh_ids
+
+@pytest.fixture
+def hierarchy():
+    """A made-up hierarchy, with one concept on two branches."""
+    return MeshHierarchy.from_hierarchy({
+        "D000001": ["C01"],
+        "D000002": ["C01.100"],
+        "D000003": ["C01.100.200", "C05.300.350"],
+        "D000004": ["C01.150"],
+        "D000068877": ["C01.100.200.010"], # a 10 character UI
+        "D000006": ["C05"],
+        "D000007": ["C01.100.300", "C05.300.350.400"],
+        "D000008": ["C05.300"],
+        "C000001": [], # supplementary concepts have no tree numbers
+        "Q000123": ["C05.900"], # not an id that can be encoded
+    })
+
+def codes(*uids):
+    return sorted(encode_mesh_id(uid) for uid in uids)
+
+def test_is_descendant(hierarchy):
+    assert hierarchy.is_descendant("D000002", "D000001")
+    assert not hierarchy.is_descendant("D000001", "D000002")
+    assert not hierarchy.is_descendant("D000002", "D000002")
+    assert not hierarchy.is_descendant("D000004", "D000002")
+
+    assert hierarchy.is_descendant("D000068877", "D000001")
+    assert hierarchy.is_descendant(encode_mesh_id("D000068877"), encode_mesh_id("D000003"))
+    assert hierarchy.is_ancestor("D000006", "D000003")
+
+    assert hierarchy.is_descendant(["D000002", "D000003", "D000006"], "D000001").tolist() == [
+        True, True, False]
+
+def test_missing_ids(hierarchy):
+    # ids not in the store, or without tree numbers, are under nothing
+    for uid in ["D999999", "C000001", "D000001"]:
+        assert not hierarchy.is_descendant(uid, "D999999")
+        assert not hierarchy.is_descendant("D999999", uid)
+        assert not hierarchy.is_descendant(uid, "C000001")
+
+    assert hierarchy.descendants("D999999").tolist() == []
+    assert hierarchy.descendants("C000001").tolist() == []
+    assert hierarchy.lowest_common_ancestor("D999999", "D999999") is None
+    assert hierarchy.lowest_common_ancestor("C000001", "D000002") is None
+
+def test_unencoded_ids_are_reported(capsys):
+    hierarchy = MeshHierarchy.from_hierarchy({"D000001": ["C01"],
+        "Q000123": ["C01.100"], "Q000456": []})
+
+    assert hierarchy.unencoded == ["Q000123", "Q000456"]
+    assert ("skipped 2 MeSH ids which can't be encoded, e.g. Q000123, Q000456"
+        in capsys.readouterr().out)
+
+    assert hierarchy.descendants("D000001").tolist() == []
+
+def test_descendants(hierarchy):
+    assert hierarchy.descendants("D000001").tolist() == codes("D000002", "D000003",
+        "D000004", "D000068877", "D000007")
+
+    assert hierarchy.decode(hierarchy.descendants("D000003")) == ["D000007", "D000068877"]
+    assert hierarchy.descendants("D000006").tolist() == codes("D000003", "D000007", "D000008")
+    assert hierarchy.descendants("D000068877").tolist() == []
+
+    # only those also under D000008 (on the C05 branch)
+    assert hierarchy.descendants("D000001", under = "D000008").tolist() == codes(
+        "D000003", "D000007")
+
+def test_descendant_pairs(hierarchy):
+    row, code = hierarchy.descendant_pairs(["D000008", "D999999", "D000002"])
+
+    assert list(zip(row.tolist(), hierarchy.decode(code))) == sorted(
+        [(0, "D000003"), (0, "D000007")]
+        + [(2, uid) for uid in ["D000003", "D000068877", "D000007"]],
+        key = lambda pair: (pair[0], encode_mesh_id(pair[1])))
+
+def test_lowest_common_ancestor(hierarchy):
+    def lca(first, second):
+        res = hierarchy.lowest_common_ancestor(first, second)
+        return None if res is None else hierarchy.decode([res])[0]
+
+    assert lca("D000068877", "D000004") == "D000001"
+    assert lca("D000068877", "D000007") == "D000002"
+    assert lca("D000003", "D000006") == "D000006"
+    assert lca("D000003", "D000003") == "D000003"
+    assert lca("D000002", "D000006") is None
+
+    # the C01 branch meets at D000002, the C05 one deeper, at D000003
+    assert lca("D000003", "D000007") == "D000003"
+
+    first = encode_mesh_ids(["D000068877", "D000002", "D000004"])
+    second = encode_mesh_ids(["D000007", "D000008", "D000004"])
+    assert hierarchy.lowest_common_ancestor(first, second).tolist() == [
+        encode_mesh_id("D000002"), -1, encode_mesh_id("D000004")]
+
+    assert np.array_equal(hierarchy.lowest_common_ancestor(first, "D000001"),
+        np.full(3, encode_mesh_id("D000001")))
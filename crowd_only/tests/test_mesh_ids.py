@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.mesh_ids import decode_mesh_id
+from src.mesh_ids import decode_mesh_ids
+from src.mesh_ids import decode_relations
+from src.mesh_ids import encode_mesh_id
+from src.mesh_ids import encode_mesh_ids
+from src.mesh_ids import encode_relations
+
+def test_round_trip():
+    for uid in ["D000001", "D003693", "D999999", "C000001", "C534883"]:
+        code = encode_mesh_id(uid)
+        assert decode_mesh_id(code, flat = False) == uid
+        assert decode_mesh_id(code) == "MESH:" + uid
+
+        assert encode_mesh_id("MESH:" + uid) == code
+
+def test_ten_character_ids():
+    short_codes = encode_mesh_ids(["D999999", "C999999"])
+    for uid in ["D000068877", "C000588056", "D000001", "C999999"]:
+        uid = uid[0] + uid[1 : ].zfill(9)
+        code = encode_mesh_id(uid)
+        assert decode_mesh_id(code, flat = False) == uid
+
+        # never the same as a 7 character id, and below 2 ** 22
+        assert code > short_codes.max() and code < 2 ** 22
+        assert code & 1 == (uid[0] == "C")
+
+    assert encode_mesh_id("D000068877") != encode_mesh_id("D068877")
+
+def test_descriptors_and_supplements_differ():
+    assert encode_mesh_id("D003693") != encode_mesh_id("C003693")
+    assert encode_mesh_id("D003693") & 1 == 0
+    assert encode_mesh_id("C003693") & 1 == 1
+
+@pytest.mark.parametrize("bad", [
+    "", "D", "D12345", "D1234567", "D12345678", "D001000000", "X000068877", "X003693", "d003693", "D00369a",
+    "MESH:", "MESH:X003693", "CHEBI:27732", "-1", None, 3693,
+])
+def test_rejects_bad_ids(bad):
+    with pytest.raises(ValueError):
+        encode_mesh_id(bad)
+
+    with pytest.raises(ValueError):
+        encode_mesh_ids(["D003693", bad])
+
+def test_encode_many():
+    values = ["MESH:D003693", "D003693", "C000001", "D003693"]
+    codes = encode_mesh_ids(values)
+
+    assert codes.dtype == np.int32
+    assert codes.tolist() == [encode_mesh_id(value) for value in values]
+    assert decode_mesh_ids(codes) == ["MESH:D003693", "MESH:D003693",
+        "MESH:C000001", "MESH:D003693"]
+
+    assert decode_mesh_ids(codes, flat = False)[2] == "C000001"
+
+def test_other_ids():
+    values = ["CHEBI:27732", "MESH:D003693", "-1", "CHEBI:16236", "CHEBI:27732"]
+    codes = encode_mesh_ids(values, allow_other = True).tolist()
+
+    # distinct negative codes in sorted order, the same for repeated ids
+    assert codes == [-3, encode_mesh_id("D003693"), -1, -2, -3]
+
+def test_relations_round_trip():
+    triples = {
+        (2, "MESH:D008012", "MESH:D007674"),
+        (1, "MESH:D003042", "MESH:D003693"),
+        (1, "MESH:C000001", "MESH:D003693"),
+    }
+    relations = encode_relations(list(triples) + [(1, "D003042", "D003693")])
+
+    assert len(relations) == 3
+    assert relations["pmid"].tolist() == [1, 1, 2]
+    assert decode_relations(relations) == triples
+    assert decode_relations(relations, flat = False) == {
+        (pmid, chem[5 : ], dise[5 : ]) for pmid, chem, dise in triples}
@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from src import mesh_store
+from src import parse_mesh
+from src.mesh_store import MeshStore
+from src.mesh_store import build_store
+from src.mesh_store import get_store
+from src.mesh_store import read_store
+from src.mesh_store import write_store
+from src.parse_mesh import load_mesh
+from src.parse_mesh import make_store
+from src.parse_mesh import parse_mesh_xml
+from src.parse_mesh import parse_supplement
+from src.parse_mesh import pickle_records
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+DESCRIPTORS = os.path.join(FIXTURES, "mesh_descriptors.xml")
+SUPPLEMENTS = os.path.join(FIXTURES, "mesh_supplements.xml")
+
+@pytest.fixture
+def store_loc(tmp_path, monkeypatch):
+    """Keep the shared store in the test's own directory."""
+    path = str(tmp_path / "mesh_store.bin")
+    monkeypatch.setattr(mesh_store, "STORE_LOC", path)
+    monkeypatch.setattr(parse_mesh, "STORE_LOC", path)
+    monkeypatch.setattr(mesh_store, "_store", None)
+    return path
+
+def as_lists(hierarchy):
+    return {mesh_id: list(tree_nums) for mesh_id, tree_nums in hierarchy.items()}
+
+def test_round_trip(store_loc, tmp_path):
+    make_store(DESCRIPTORS, SUPPLEMENTS, store_loc)
+    assert os.listdir(str(tmp_path)) == ["mesh_store.bin"]
+
+    store = MeshStore(read_store(store_loc))
+    assert len(store) == 7
+    assert "D051437" in store and "D999999" not in store
+
+    assert store.get_name("D007676") == "Kidney Failure, Chronic"
+    assert store.get_name("C000002") == "test compound β"
+    assert store.get_name("D999999", "?") == "?"
+
+    # tree numbers come back in the order MeSH lists them
+    assert store.get_tree_numbers("D007674") == ["C12.777", "C13.351"]
+    assert store.get_tree_numbers("D005260") == []
+    assert store.get_tree_numbers("C000001") == []
+
+    # the same as parsing the whole XML files
+    concept_name, hierarchy = parse_mesh_xml(DESCRIPTORS)
+    assert store.names() == concept_name
+    assert store.hierarchy() == as_lists(hierarchy)
+    assert store.names(supplemental = True) == parse_supplement(SUPPLEMENTS)
+
+def test_shared_store_is_mapped_on_first_use(store_loc):
+    with pytest.raises(AssertionError):
+        get_store()
+
+    make_store(DESCRIPTORS, SUPPLEMENTS, store_loc)
+    assert mesh_store._store is None
+
+    store = get_store()
+    assert get_store() is store
+    assert not store.arrays["ids"].flags.writeable
+
+    concept_name, hierarchy = parse_mesh_xml(DESCRIPTORS)
+    names, tree_nums = load_mesh("hierarchy")
+    assert names == concept_name and tree_nums == as_lists(hierarchy)
+    assert load_mesh("supp") == parse_supplement(SUPPLEMENTS)
+
+def test_concurrent_writes(store_loc, tmp_path):
+    records = [[(mesh_id, "name {}".format(i), ["C{:02d}.{:03d}".format(i, j)])
+        for j, mesh_id in enumerate(["D000001", "D000002", "D000003"])]
+        for i in range(16)]
+
+    with ThreadPoolExecutor(max_workers = 8) as pool:
+        list(pool.map(lambda recs: write_store(build_store(recs), store_loc), records * 4))
+
+    # one complete store, and no temporary files left behind
+    assert os.listdir(str(tmp_path)) == ["mesh_store.bin"]
+    store = MeshStore(read_store(store_loc))
+    assert store.names() in [{mesh_id: name for mesh_id, name, trees in recs}
+        for recs in records]
+
+def test_pickle_fallback(store_loc, tmp_path):
+    concept_name, hierarchy = parse_mesh_xml(DESCRIPTORS)
+    supplement = parse_supplement(SUPPLEMENTS)
+
+    # the pickles written by earlier versions of parse_mesh
+    with open(str(tmp_path / "mesh_hierarchy.pickle"), "wb") as fout:
+        pickle.dump((concept_name, dict(hierarchy)), fout)
+
+    with open(str(tmp_path / "mesh_supp.pickle"), "wb") as fout:
+        pickle.dump(supplement, fout)
+
+    assert load_mesh("hierarchy") == (concept_name, dict(hierarchy))
+    assert load_mesh("supp") == supplement
+    assert mesh_store._store is None
+
+    # converting the pickles gives the same store as the XML files
+    write_store(build_store(pickle_records(str(tmp_path))), store_loc)
+
+    names, tree_nums = load_mesh("hierarchy")
+    assert names == concept_name and tree_nums == as_lists(hierarchy)
+    assert load_mesh("supp") == supplement
+
+def test_import_needs_no_mesh_data():
+    # a fresh interpreter, where nothing has touched the store yet
+    code = ("import src.eval_perf, src.mesh_filter, src.mesh_hierarchy\n"
+        "assert src.mesh_store._store is None\n"
+        "assert src.mesh_hierarchy._hierarchy is None\n")
+
+    subprocess.run([sys.executable, "-c", code], check = True,
+        cwd = os.path.join(FIXTURES, "..", ".."))
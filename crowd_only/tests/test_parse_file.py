@@ -0,0 +1,87 @@
+import os
+import pickle
+import shutil
+
+import pytest
+
+from src import data_model
+from src.data_model import corpus_cache_key
+from src.data_model import parse_file
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+@pytest.fixture
+def corpus(tmp_path):
+    shutil.copy(os.path.join(FIXTURES, "sample.PubTator"), str(tmp_path))
+    return {"loc": str(tmp_path), "fname": "sample.PubTator", "fix_acronyms": False}
+
+def summary(papers):
+    return {pmid: (paper.text, [(s.start, s.stop) for s in paper.sentences],
+        {origin: sorted((chem.flat_repr, dise.flat_repr) for chem, dise in rels)
+            for origin, rels in paper.poss_relations.items()})
+        for pmid, paper in papers.items()}
+
+
+class OldPosition:
+    """Pickles like a Position from before sentence and annotation text was
+    sliced out of the document, when text was still a slot.
+    """
+    def __reduce__(self):
+        return (object.__new__, (data_model.Position, ),
+            (None, {"text": "delirium", "start": 22, "stop": 30}))
+
+def test_cache_hit(corpus, tmp_path, shared_splitter, capsys):
+    save_loc = str(tmp_path / "corpus.pickle")
+
+    first = parse_file(save_loc, **corpus)
+    assert "Corpus cache miss" in capsys.readouterr().out
+    assert sorted(first) == [439781, 2491759]
+
+    second = parse_file(save_loc, **corpus)
+    assert "Corpus cache hit" in capsys.readouterr().out
+    assert summary(second) == summary(first)
+
+def test_old_schema_is_a_cache_miss(corpus, tmp_path, shared_splitter, capsys):
+    save_loc = str(tmp_path / "corpus.pickle")
+
+    # a cache from before the header was written separately, holding Papers
+    # which can no longer be unpickled
+    with open(save_loc, "wb") as fout:
+        pickle.dump({"key": corpus_cache_key(corpus["loc"], corpus["fname"], False),
+            "papers": {439781: OldPosition()}, "validation": "strict"}, fout)
+
+    with pytest.raises(AttributeError):
+        with open(save_loc, "rb") as fin:
+            pickle.load(fin)
+
+    papers = parse_file(save_loc, **corpus)
+    assert "Corpus cache miss: {} (out of date)".format(save_loc) in capsys.readouterr().out
+    assert sorted(papers) == [439781, 2491759]
+
+def test_payload_is_only_read_when_usable(corpus, tmp_path, shared_splitter, capsys):
+    save_loc = str(tmp_path / "corpus.pickle")
+    parse_file(save_loc, **corpus)
+
+    # a header for other settings in front of Papers that can't be unpickled
+    with open(save_loc, "rb") as fin:
+        header = pickle.load(fin)
+
+    header["key"]["fix_acronyms"] = True
+    with open(save_loc, "wb") as fout:
+        pickle.dump(header, fout)
+        pickle.dump(OldPosition(), fout)
+
+    parse_file(save_loc, **corpus)
+    assert "out of date" in capsys.readouterr().out
+
+def test_key_covers_parsing_modules(corpus, monkeypatch):
+    key = corpus_cache_key(corpus["loc"], corpus["fname"], False)
+
+    for name in ["data_model.py", "triggers.py", "befree.py", "mesh_ids.py"]:
+        real_hash = data_model.file_hash
+        changed = lambda path, name = name: (
+            "changed" if os.path.basename(path) == name else real_hash(path))
+
+        monkeypatch.setattr(data_model, "file_hash", changed)
+        assert corpus_cache_key(corpus["loc"], corpus["fname"], False) != key
+        monkeypatch.setattr(data_model, "file_hash", real_hash)
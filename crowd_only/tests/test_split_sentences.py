@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import os
+import random
+
+from src.lingpipe import split_sentences
+from src.lingpipe.split_cache import SplitCache
+
+from stub_splitter import sentence_spans
+
+WORDS = ["cocaine", "induced", "seizures", "in", "rats", "were", "reduced", "by",
+    "lidocaine", "café", "β-blockers", "(n = 12)", "patients", "with", "renal", "failure"]
+
+def make_abstract(rng):
+    sentences = []
+    for i in range(rng.randint(1, 8)):
+        words = rng.choices(WORDS, k = rng.randint(3, 30))
+        sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+
+    return " ".join(sentences)
+
+def split_batch(splitter, seed):
+    rng = random.Random(seed)
+    abstracts = [make_abstract(rng) for i in range(rng.randint(1, 20))]
+    return (abstracts, splitter.split_many_spans(abstracts))
+
+def test_concurrent_splits_in_threads(splitter):
+    with ThreadPoolExecutor(max_workers = 16) as pool:
+        results = list(pool.map(lambda seed: split_batch(splitter, seed), range(400)))
+
+    for abstracts, spans in results:
+        assert spans == [sentence_spans(abstract) for abstract in abstracts]
+
+def test_shared_splitter_in_threads(shared_splitter):
+    assert split_sentences.get_splitter() is shared_splitter
+
+    rng = random.Random(0)
+    abstracts = [make_abstract(rng) for i in range(300)]
+    with ThreadPoolExecutor(max_workers = 16) as pool:
+        res = list(pool.map(split_sentences.split_abstract, abstracts))
+
+    for abstract, sentences in zip(abstracts, res):
+        assert sentences == [abstract[start : stop] for start, stop in sentence_spans(abstract)]
+
+def split_in_child(seed):
+    # the shared splitter is inherited from the parent by the fork
+    abstracts, spans = split_batch(split_sentences.get_splitter(), seed)
+    return (os.getpid(), spans == [sentence_spans(abstract) for abstract in abstracts])
+
+def test_concurrent_splits_after_fork(shared_splitter):
+    splitter = shared_splitter
+
+    # the parent's process is running before the workers are forked
+    split_batch(splitter, -1)
+    parent_proc = splitter.proc
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(4) as pool:
+        results = pool.map(split_in_child, range(200))
+
+    assert all(ok for pid, ok in results)
+    assert len({pid for pid, ok in results}) > 1
+
+    # the parent still uses its own process
+    abstracts, spans = split_batch(splitter, -2)
+    assert spans == [sentence_spans(abstract) for abstract in abstracts]
+    assert splitter.proc is parent_proc
+
+def wait_in_child(splitter, forked, done):
+    splitter.check_fork()
+    forked.set()
+    done.wait(30)
+
+def test_fork_releases_parent_pipe(splitter):
+    split_batch(splitter, 0)
+    proc = splitter.proc
+
+    context = multiprocessing.get_context("fork")
+    forked = context.Event()
+    done = context.Event()
+    child = context.Process(target = wait_in_child, args = (splitter, forked, done))
+    child.start()
+    try:
+        assert forked.wait(30)
+
+        # with the child still holding a copy of the input pipe, the splitter
+        # would never see the end of its input and have to be killed
+        splitter.close()
+        assert proc.returncode == 0
+    finally:
+        done.set()
+        child.join()
+
+def test_cache_location(tmp_path, monkeypatch):
+    monkeypatch.delenv(split_sentences.CACHE_ENV)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    assert split_sentences.default_cache_loc() == str(
+        tmp_path / "xdg" / "crowd_only" / "split_cache.sqlite")
+
+    monkeypatch.setenv(split_sentences.CACHE_ENV, str(tmp_path / "elsewhere.sqlite"))
+    assert split_sentences.default_cache_loc() == str(tmp_path / "elsewhere.sqlite")
+
+def test_cached_splits(splitter, tmp_path, monkeypatch):
+    monkeypatch.setattr(split_sentences, "_splitter", splitter)
+
+    loc = tmp_path / "splits" / "cache.sqlite"
+    monkeypatch.setenv(split_sentences.CACHE_ENV, str(loc))
+
+    rng = random.Random(1)
+    abstracts = [make_abstract(rng) for i in range(20)]
+    expected = [sentence_spans(abstract) for abstract in abstracts]
+
+    assert split_sentences.split_spans(abstracts) == expected
+    assert loc.exists()
+    assert len(split_sentences.get_cache()) == len(set(abstracts))
+
+    # cached splits no longer need the splitter
+    splitter.close()
+    monkeypatch.setattr(split_sentences, "_splitter", None)
+    monkeypatch.setattr(split_sentences, "get_splitter", None)
+    assert split_sentences.split_spans(abstracts) == expected
+
+    # a cache given to set_cache is used instead
+    other = SplitCache(str(tmp_path / "other.sqlite"), split_sentences.SPLITTER_VERSION)
+    split_sentences.set_cache(other)
+    assert split_sentences.get_cache() is other
+    assert other.lookup(abstracts[ : 1]) == [None]